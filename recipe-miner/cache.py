@@ -0,0 +1,281 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+def cache_dir() -> str:
+    """Directory for the local caches; read when a store is created so a .env loaded after import applies"""
+    return os.getenv("MINER_CACHE_DIR", "cache")
+
+
+class _SqliteStore:
+    """Thread-safe SQLite file shared by the local caches.
+
+    Uses WAL mode so several worker processes on one host can read and write
+    the same cache file.
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+            self._conn.commit()
+            return rows
+
+    def _evict_to_size(self, table: str, max_bytes: int):
+        """Drop least recently used rows until the table fits in max_bytes"""
+        with self._lock:
+            total = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+            if total <= max_bytes:
+                return
+            rows = self._conn.execute(f"SELECT key, size FROM {table} ORDER BY accessed_at").fetchall()
+            for key, size in rows:
+                if total <= max_bytes:
+                    break
+                self._conn.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+                total -= size
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+@dataclass
+class CachedPage:
+    url: str
+    html: str
+    text: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    ttl_seconds: int
+    structured: Optional[Dict] = None
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() - self.fetched_at < self.ttl_seconds
+
+
+class ScrapeCache(_SqliteStore):
+    """Persistent cache of scraped pages keyed by URL hash.
+
+    Stores both the raw HTML (compressed) and the extracted text or
+    structured schema.org recipe, plus the ETag / Last-Modified validators so
+    stale entries can be revalidated with a conditional request instead of a
+    full download.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS scrape_cache (
+        key TEXT PRIMARY KEY,
+        url TEXT NOT NULL,
+        html BLOB NOT NULL,
+        text TEXT,
+        structured TEXT,
+        etag TEXT,
+        last_modified TEXT,
+        size INTEGER NOT NULL,
+        fetched_at REAL NOT NULL,
+        accessed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_scrape_cache_accessed_at ON scrape_cache(accessed_at);
+    """
+
+    def __init__(self, path: str = None, ttl_seconds: int = None, max_bytes: int = None):
+        super().__init__(path or os.path.join(cache_dir(), "scrape_cache.sqlite"))
+        self.ttl_seconds = ttl_seconds or int(float(os.getenv("SCRAPE_CACHE_TTL_HOURS", 168)) * 3600)
+        self.max_bytes = max_bytes or int(float(os.getenv("SCRAPE_CACHE_MAX_MB", 512)) * 1024 * 1024)
+        
+        # Cache files created before structured extraction lack the column
+        columns = {row[1] for row in self._execute("PRAGMA table_info(scrape_cache)")}
+        if "structured" not in columns:
+            self._execute("ALTER TABLE scrape_cache ADD COLUMN structured TEXT")
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha256(url.strip().encode("utf-8")).hexdigest()
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """Return the cached page (fresh or stale), or None if never fetched"""
+        key = self.key_for(url)
+        rows = self._execute(
+            "SELECT html, text, structured, etag, last_modified, fetched_at FROM scrape_cache WHERE key = ?",
+            (key,)
+        )
+        if not rows:
+            return None
+        html, text, structured, etag, last_modified, fetched_at = rows[0]
+        self._execute("UPDATE scrape_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return CachedPage(
+            url=url,
+            html=zlib.decompress(html).decode("utf-8"),
+            text=text,
+            etag=etag,
+            last_modified=last_modified,
+            fetched_at=fetched_at,
+            ttl_seconds=self.ttl_seconds,
+            structured=json.loads(structured) if structured else None,
+        )
+
+    def put(self, url: str, html: str, text: Optional[str],
+            etag: Optional[str] = None, last_modified: Optional[str] = None,
+            structured: Optional[Dict] = None):
+        """Store a freshly downloaded page and its extracted content"""
+        compressed = zlib.compress(html.encode("utf-8"))
+        structured_json = json.dumps(structured) if structured else None
+        size = len(compressed) + len((text or "").encode("utf-8")) + len(structured_json or "")
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO scrape_cache "
+            "(key, url, html, text, structured, etag, last_modified, size, fetched_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.key_for(url), url, compressed, text, structured_json, etag, last_modified, size, now, now),
+        )
+        self._evict_to_size("scrape_cache", self.max_bytes)
+
+    def mark_revalidated(self, url: str):
+        """Restart the TTL of an entry the server confirmed unchanged (HTTP 304)"""
+        now = time.time()
+        self._execute(
+            "UPDATE scrape_cache SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+            (now, now, self.key_for(url)),
+        )
+
+
+class SearchCache(_SqliteStore):
+    """Persistent cache of web search results keyed by normalized query and result count"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS search_cache (
+        key TEXT PRIMARY KEY,
+        query TEXT NOT NULL,
+        max_results INTEGER NOT NULL,
+        results_json TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_search_cache_expires_at ON search_cache(expires_at);
+    """
+
+    def __init__(self, path: str = None, ttl_seconds: int = None):
+        super().__init__(path or os.path.join(cache_dir(), "search_cache.sqlite"))
+        self.ttl_seconds = ttl_seconds or int(float(os.getenv("SEARCH_CACHE_TTL_HOURS", 72)) * 3600)
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def key_for(self, query: str, max_results: int) -> str:
+        return hashlib.sha256(f"{self.normalize(query)}|{max_results}".encode("utf-8")).hexdigest()
+
+    def get(self, query: str, max_results: int) -> Optional[List[Dict]]:
+        """Return unexpired results for the query, or None on a miss"""
+        rows = self._execute(
+            "SELECT results_json FROM search_cache WHERE key = ? AND expires_at > ?",
+            (self.key_for(query, max_results), time.time()),
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    def put(self, query: str, max_results: int, results: List[Dict]):
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO search_cache "
+            "(key, query, max_results, results_json, created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (self.key_for(query, max_results), self.normalize(query), max_results,
+             json.dumps(results), now, now + self.ttl_seconds),
+        )
+
+    def purge_expired(self) -> int:
+        """Delete expired entries, returning how many were removed"""
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            self._conn.commit()
+            return deleted
+
+
+class LLMCache(_SqliteStore):
+    """Local LLM response cache keyed by model, temperature and prompt hash.
+
+    Mirrors the `llm_cache` table from the add_llm_runs migration (key,
+    response_json, created_at, ttl_seconds, expires_at) with an extra
+    accessed_at column for least-recently-used eviction.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        key TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        temperature REAL NOT NULL,
+        prompt_hash TEXT NOT NULL,
+        response_json TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        ttl_seconds INTEGER NOT NULL,
+        expires_at REAL NOT NULL,
+        accessed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_llm_cache_expires_at ON llm_cache(expires_at);
+    CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed_at ON llm_cache(accessed_at);
+    """
+
+    def __init__(self, path: str = None, ttl_seconds: int = None, max_entries: int = None):
+        super().__init__(path or os.path.join(cache_dir(), "llm_cache.sqlite"))
+        self.ttl_seconds = ttl_seconds or int(float(os.getenv("LLM_CACHE_TTL_HOURS", 720)) * 3600)
+        self.max_entries = max_entries or int(os.getenv("LLM_CACHE_MAX_ENTRIES", 20000))
+
+    @staticmethod
+    def prompt_hash(prompt: str) -> str:
+        return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+    def key_for(self, model: str, temperature: float, prompt: str) -> str:
+        return hashlib.sha256(f"{model}|{temperature}|{self.prompt_hash(prompt)}".encode("utf-8")).hexdigest()
+
+    def get(self, model: str, temperature: float, prompt: str) -> Optional[str]:
+        """Return the cached raw response text, or None on a miss or expiry"""
+        key = self.key_for(model, temperature, prompt)
+        now = time.time()
+        rows = self._execute(
+            "SELECT response_json FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+        )
+        if not rows:
+            return None
+        self._execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return rows[0][0]
+
+    def put(self, model: str, temperature: float, prompt: str, response_text: str):
+        key = self.key_for(model, temperature, prompt)
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO llm_cache "
+            "(key, model, temperature, prompt_hash, response_json, created_at, ttl_seconds, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, model, temperature, self.prompt_hash(prompt), response_text,
+             now, self.ttl_seconds, now + self.ttl_seconds, now),
+        )
+        self._evict()
+
+    def _evict(self):
+        """Drop expired entries, then the least recently used beyond max_entries"""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
@@ -0,0 +1,149 @@
+import json
+import re
+from typing import Dict, List, Optional, Tuple, Union
+
+# Rough chars-per-token ratio for English/Spanish prose with Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+INGREDIENT_HEADINGS = re.compile(
+    r"^\W*(ingredients?|ingredientes|what you('ll)? need|for the \w+|shopping list)\b",
+    re.IGNORECASE,
+)
+INSTRUCTION_HEADINGS = re.compile(
+    r"^\W*(instructions?|directions?|method|preparation|steps?|how to make( it)?|"
+    r"instrucciones|preparaci[oó]n|modo de preparaci[oó]n|procedimiento)\b",
+    re.IGNORECASE,
+)
+# Everything after these is reader comments or site chrome
+END_MARKERS = re.compile(
+    r"^\W*(\d+\s+)?(comments?|reviews?|leave a (reply|comment|review)|related (recipes|posts)|"
+    r"you may also like|more recipes|about the author|comentarios)\b",
+    re.IGNORECASE,
+)
+BOILERPLATE = re.compile(
+    r"(subscribe|newsletter|sign up|jump to recipe|print recipe|pin (it|this)|rate this recipe|"
+    r"share on|follow (me|us)|cookie|advertisement|affiliate|sponsored|all rights reserved|"
+    r"privacy policy|click here|as an amazon associate)",
+    re.IGNORECASE,
+)
+QUANTITY_LINE = re.compile(r"^\s*([-*•]\s*)?(\d|[½¼¾⅓⅔⅛]|a (pinch|handful|dash)\b)", re.IGNORECASE)
+NUMBERED_STEP = re.compile(r"^\s*(step\s*)?\d+[.):]\s+\S", re.IGNORECASE)
+
+
+def estimate_tokens(source: Union[str, Dict]) -> int:
+    text = source if isinstance(source, str) else json.dumps(source)
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _strip_boilerplate(lines: List[str]) -> List[str]:
+    return [line for line in lines if line.strip() and not BOILERPLATE.search(line)]
+
+
+def _find_section(lines: List[str], pattern: re.Pattern) -> Optional[int]:
+    """Index of the first short heading-like line matching pattern"""
+    for idx, line in enumerate(lines):
+        if len(line) <= 60 and pattern.search(line):
+            return idx
+    return None
+
+
+def _recipe_span(lines: List[str]) -> Optional[Tuple[int, int]]:
+    """Start/end of the ingredient-through-instructions block, if one is recognisable"""
+    start = _find_section(lines, INGREDIENT_HEADINGS)
+    if start is None:
+        start = _find_section(lines, INSTRUCTION_HEADINGS)
+    if start is None:
+        return None
+
+    end = len(lines)
+    for idx in range(start + 1, len(lines)):
+        if len(lines[idx]) <= 60 and END_MARKERS.search(lines[idx]):
+            end = idx
+            break
+    return start, end
+
+
+def compact_source(text: str) -> str:
+    """Reduce a scraped page to the parts that matter for a consensus recipe.
+
+    Keeps the ingredient and instruction sections when they can be found and
+    drops site boilerplate everywhere. Pages without recognisable sections
+    fall back to quantity lines, numbered steps and the remaining prose.
+    """
+    lines = _strip_boilerplate(text.splitlines())
+    span = _recipe_span(lines)
+
+    if span:
+        start, end = span
+        # Keep the page title for context, then the recipe block itself
+        kept = ([lines[0]] if start > 0 else []) + lines[start:end]
+    else:
+        # Put the recipe-shaped lines first so a tight budget truncates prose, not ingredients
+        is_recipe_line = [bool(QUANTITY_LINE.match(line) or NUMBERED_STEP.match(line)) for line in lines]
+        kept = ([line for line, keep in zip(lines, is_recipe_line) if keep] +
+                [line for line, keep in zip(lines, is_recipe_line) if not keep])
+
+    return "\n".join(line.strip() for line in kept)
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    return text[:cut if cut > max_chars // 2 else max_chars]
+
+
+def _trim_structured(recipe: Dict, max_tokens: int) -> Dict:
+    """Drop trailing steps, then trailing ingredients, until the recipe fits max_tokens"""
+    recipe = dict(recipe, ingredients=list(recipe.get("ingredients") or []), steps=list(recipe.get("steps") or []))
+    while estimate_tokens(recipe) > max_tokens and (recipe["steps"] or recipe["ingredients"]):
+        (recipe["steps"] or recipe["ingredients"]).pop()
+    return recipe
+
+
+def _fair_shares(sizes: List[int], budget: int) -> List[int]:
+    """Split budget across items: small ones keep their full size, and what they leave goes to the larger ones"""
+    shares = [0] * len(sizes)
+    remaining = budget
+    pending = sorted(range(len(sizes)), key=lambda i: sizes[i])
+    while pending:
+        idx = pending.pop(0)
+        shares[idx] = min(sizes[idx], max(remaining, 0) // (len(pending) + 1))
+        remaining -= shares[idx]
+    return shares
+
+
+def compact_sources(sources: List[Union[str, Dict]], token_budget: int) -> List[Union[str, Dict]]:
+    """Compact every source and split token_budget fairly across them.
+
+    Structured (schema.org) sources are already minimal, so they are served
+    from the budget first and only lose trailing steps or ingredients when
+    they alone exceed it. Text sources share what is left: short ones keep
+    everything, and the budget they leave unused goes to the longer ones
+    instead of being wasted on a fixed per-source cap. Sources cut down to
+    nothing are dropped.
+    """
+    compacted = [source if isinstance(source, dict) else compact_source(source) for source in sources]
+    structured = [idx for idx, source in enumerate(compacted) if isinstance(source, dict)]
+    text = [idx for idx, source in enumerate(compacted) if isinstance(source, str)]
+
+    allowance = [0] * len(compacted)
+    shares = _fair_shares([estimate_tokens(compacted[idx]) for idx in structured], token_budget)
+    for idx, share in zip(structured, shares):
+        allowance[idx] = share
+    remaining = token_budget - sum(shares)
+    for idx, share in zip(text, _fair_shares([estimate_tokens(compacted[idx]) for idx in text], remaining)):
+        allowance[idx] = share
+
+    result = []
+    for idx, source in enumerate(compacted):
+        if isinstance(source, dict):
+            source = _trim_structured(source, allowance[idx])
+            if source["ingredients"] or source["steps"]:
+                result.append(source)
+        else:
+            source = _truncate_to_tokens(source, allowance[idx])
+            if source.strip():
+                result.append(source)
+    return result
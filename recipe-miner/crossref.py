@@ -0,0 +1,257 @@
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+TOKEN = re.compile(r"[a-zñáéíóúü]+")
+
+# Words that describe how an ingredient is bought or prepared, not what it is
+DESCRIPTORS = {
+    "fresh", "freshly", "chopped", "diced", "minced", "sliced", "large", "small", "medium", "whole",
+    "boneless", "skinless", "peeled", "seeded", "finely", "roughly", "coarsely", "thinly", "optional",
+    "taste", "garnish", "crumbled", "shredded", "grated", "dried", "frozen", "canned", "cooked", "raw",
+    "ripe", "softened", "melted", "room", "temperature", "cut", "into", "pieces", "piece", "and", "or",
+    "of", "for", "to", "the", "a", "an", "about", "plus", "more", "extra", "divided", "packed", "lightly",
+    "halved", "quartered", "cubed", "juiced", "zested", "trimmed", "rinsed", "drained", "toasted",
+    "low", "sodium", "unsalted", "salted", "organic", "homemade", "store", "bought", "good", "quality",
+}
+
+# Each group names one ingredient; a match on any member counts for all of them
+SYNONYMS = [
+    ["cilantro", "coriander", "coriander leaf"],
+    ["scallion", "green onion", "spring onion"],
+    ["chile", "chili", "chilli"],
+    ["chickpea", "garbanzo", "garbanzo bean"],
+    ["bell pepper", "capsicum"],
+    ["eggplant", "aubergine"],
+    ["zucchini", "courgette", "calabacita"],
+    ["shrimp", "prawn", "camaron"],
+    ["corn", "maize", "elote"],
+    ["broth", "stock", "caldo"],
+    ["powdered sugar", "confectioners sugar", "icing sugar"],
+    ["cornstarch", "cornflour"],
+    ["heavy cream", "double cream", "whipping cream"],
+    ["ground beef", "minced beef", "beef mince"],
+    ["tomatillo", "tomate verde"],
+    ["queso fresco", "fresh cheese"],
+    ["crema", "mexican crema", "cream"],
+    ["noodle", "fideo", "vermicelli"],
+    ["hominy", "pozole"],
+    ["egg", "yolk", "egg yolk", "egg white"],
+    # Spanish and English names recipes mix freely
+    ["onion", "cebolla"],
+    ["garlic", "ajo"],
+    ["tomato", "jitomate", "tomate"],
+    ["lime", "limón", "limon"],
+    ["cheese", "queso"],
+    ["rice", "arroz"],
+    ["bean", "frijol", "frijoles"],
+    ["chicken", "pollo"],
+    ["pork", "cerdo", "puerco"],
+    ["avocado", "aguacate"],
+    ["oregano", "orégano"],
+    ["pumpkin seed", "pepita"],
+]
+
+# Foods a step may mention; used to spot references to ingredients missing from the list.
+# Things recipes usually make along the way (broth, salsa, dough) are left out.
+LEXICON = [
+    "onion", "garlic", "tomato", "tomatillo", "potato", "carrot", "celery", "cabbage", "lettuce", "spinach",
+    "avocado", "cucumber", "radish", "mushroom", "bell pepper", "jalapeño", "jalapeno", "serrano", "poblano",
+    "chipotle", "ancho", "guajillo", "habanero", "chile", "pepper", "cilantro", "parsley", "oregano",
+    "cumin", "cinnamon", "bay leaf", "thyme", "basil", "rosemary", "paprika", "epazote", "lime",
+    "lemon", "orange juice", "salt", "sugar", "brown sugar", "honey", "flour", "masa", "masa harina",
+    "cornstarch", "baking powder", "baking soda", "yeast", "butter", "oil", "olive oil", "lard", "milk",
+    "heavy cream", "sour cream", "crema", "cheese", "queso fresco", "cotija", "egg", "chicken", "beef",
+    "pork", "chorizo", "bacon", "ham", "turkey", "fish", "shrimp", "rice", "bean", "black bean",
+    "pinto bean", "lentil", "chickpea", "corn", "hominy", "tortilla", "tortilla chip", "bread", "noodle",
+    "pasta", "vinegar", "wine", "beer", "chocolate", "vanilla", "peanut", "almond", "sesame seed",
+    "pumpkin seed", "raisin", "mayonnaise", "ketchup", "mustard", "soy sauce", "zucchini",
+    "eggplant", "scallion", "shallot", "leek", "ginger", "nutmeg", "allspice", "anise", "piloncillo",
+]
+
+# Never expected on an ingredient list
+IMPLICIT = {"water", "ice"}
+
+# Basic seasonings: often listed but only "added to taste", or used without being listed
+SEASONINGS = {"salt", "pepper", "black pepper", "white pepper", "kosher salt", "sea salt"}
+SEASONING_WORDS = {word for seasoning in SEASONINGS for word in seasoning.split()}
+
+# Optional extras and garnishes ("a squeeze of lime, if you wish") aren't held to the list
+OPTIONAL = re.compile(r"\b(?:if (?:you )?(?:wish|like|want|desired|preferred)|optional(?:ly)?|garnish\w*|to taste)\b")
+SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+
+
+def singular(word: str) -> str:
+    """Crude English singular, applied alike to patterns and text so plurals still match"""
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("oes"):
+        return word[:-2]
+    if word.endswith("ves"):
+        return word[:-3] + "f"
+    if word.endswith(("ches", "shes", "xes", "sses")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokens(text: str) -> List[str]:
+    return [singular(token) for token in TOKEN.findall((text or "").lower())]
+
+
+def ingredient_terms(name: str) -> List[Tuple[str, ...]]:
+    """Phrases that count as a mention of an ingredient: its name, its content words and their synonyms"""
+    # "onions, finely chopped (about 2)" -> "onions"; "crema (or sour cream)" also names "sour cream"
+    lowered = (name or "").lower()
+    core = re.sub(r"\(.*?\)", " ", lowered).split(",")[0]
+    names = [core] + re.findall(r"\bor ([^(),]+)", lowered)
+    terms = set()
+    for text in names:
+        words = tuple(token for token in tokens(text) if token not in DESCRIPTORS)
+        if words:
+            terms.add(words)
+    for group in SYNONYMS:
+        group_terms = [tuple(tokens(member)) for member in group]
+        if any(_contains(words, term) for words in list(terms) for term in group_terms):
+            terms.update(group_terms)
+    # Steps often shorten a name to one of its words ("the cheese" for "queso fresco")
+    terms.update(
+        (word,) for term in list(terms) for word in term
+        if len(word) > 2 and word not in DESCRIPTORS
+    )
+    return [term for term in terms if term]
+
+
+def is_incidental(name: str) -> bool:
+    """Whether a listed ingredient is a basic seasoning or marked optional, so steps needn't use it"""
+    lowered = (name or "").lower()
+    if OPTIONAL.search(lowered):
+        return True
+    core = re.sub(r"\(.*?\)", " ", lowered).split(",")[0]
+    words = {token for token in tokens(core) if token not in DESCRIPTORS}
+    return bool(words) and words <= SEASONING_WORDS
+
+
+def _contains(words: Tuple[str, ...], term: Tuple[str, ...]) -> bool:
+    n = len(term)
+    return any(words[i:i + n] == term for i in range(len(words) - n + 1))
+
+
+class TokenAutomaton:
+    """Aho-Corasick automaton over word tokens.
+
+    Finds every occurrence of every pattern in one left-to-right pass over
+    the text, so the cost is linear in the text length no matter how many
+    patterns there are. Working on tokens rather than characters keeps
+    matches on word boundaries ("oil" never matches inside "boil").
+    """
+
+    def __init__(self, patterns: Dict[Tuple[str, ...], object]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, object]]] = [[]]
+        for pattern, value in patterns.items():
+            self._add(pattern, value)
+        self._build()
+
+    def _add(self, pattern: Tuple[str, ...], value: object):
+        state = 0
+        for token in pattern:
+            if token not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][token] = len(self._goto) - 1
+            state = self._goto[state][token]
+        self._out[state].append((len(pattern), value))
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(token, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def finditer(self, words: List[str]) -> Iterator[Tuple[int, int, object]]:
+        """Yield (start, end, value) for every pattern occurrence in the token list"""
+        state = 0
+        for idx, token in enumerate(words):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for length, value in self._out[state]:
+                yield idx + 1 - length, idx + 1, value
+
+
+_lexicon_automaton: Optional[TokenAutomaton] = None
+
+
+def _lexicon() -> TokenAutomaton:
+    global _lexicon_automaton
+    if _lexicon_automaton is None:
+        _lexicon_automaton = TokenAutomaton({tuple(tokens(term)): term for term in LEXICON})
+    return _lexicon_automaton
+
+
+@dataclass
+class CrossReference:
+    unused: List[str] = field(default_factory=list)  # Listed ingredients no step mentions
+    unknown: List[str] = field(default_factory=list)  # Foods the steps mention that aren't listed
+
+
+def cross_reference(ingredients: List[str], steps: List[str]) -> CrossReference:
+    """Match ingredient names against step instructions in both directions"""
+    patterns: Dict[Tuple[str, ...], Set[int]] = {}
+    listed_words: Set[str] = set()
+    for idx, name in enumerate(ingredients):
+        for term in ingredient_terms(name):
+            patterns.setdefault(term, set()).add(idx)
+            listed_words.update(term)
+
+    automaton = TokenAutomaton(patterns)
+    used: Set[int] = set()
+    unknown: Dict[str, None] = {}
+    for instruction in steps:
+        words = tokens(instruction)
+        for _, _, owners in automaton.finditer(words):
+            used.update(owners)
+
+        # Optional extras and garnishes may name foods the list leaves out
+        required = " ".join(
+            sentence for sentence in SENTENCE_END.split((instruction or "").lower())
+            if not OPTIONAL.search(sentence)
+        )
+        words = tokens(required)
+
+        # Keep the longest lexicon match at each position ("sour cream" over "cream")
+        longest: Dict[int, Tuple[int, str]] = {}
+        for start, end, term in _lexicon().finditer(words):
+            if start not in longest or end > longest[start][0]:
+                longest[start] = (end, term)
+        covered = 0
+        for start in sorted(longest):
+            end, term = longest[start]
+            if end <= covered:
+                continue  # Inside a longer match already checked
+            covered = end
+            # Lenient on purpose: "tortilla chips" fried from listed tortillas is not a new ingredient
+            if term in IMPLICIT or term in SEASONINGS or any(word in listed_words for word in words[start:end]):
+                continue
+            unknown[term] = None
+
+    return CrossReference(
+        unused=[
+            name for idx, name in enumerate(ingredients)
+            if idx not in used and not is_incidental(name)
+        ],
+        unknown=list(unknown),
+    )
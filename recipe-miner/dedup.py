@@ -0,0 +1,62 @@
+import hashlib
+import json
+import random
+import re
+from typing import Dict, List, Tuple, Union
+
+from compaction import compact_source
+
+WORD = re.compile(r"\w+")
+MAX_HASH = (1 << 64) - 1
+
+
+class MinHasher:
+    """MinHash signatures over word shingles for estimating Jaccard similarity"""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        # XOR masks stand in for independent hash permutations
+        self.masks = [rng.getrandbits(64) for _ in range(num_perm)]
+
+    def _shingle_hashes(self, text: str) -> List[int]:
+        words = WORD.findall(text.lower())
+        if len(words) < self.shingle_size:
+            words = words + [""] * (self.shingle_size - len(words))
+        shingles = {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+        return [
+            int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+            for shingle in shingles
+        ]
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        hashes = self._shingle_hashes(text)
+        return tuple(min(h ^ mask for h in hashes) if hashes else MAX_HASH for mask in self.masks)
+
+    @staticmethod
+    def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def _fingerprint_text(source: Union[str, Dict]) -> str:
+    """The part of a source that identifies it: its recipe content, not the page chrome"""
+    if isinstance(source, dict):
+        return json.dumps([source.get("ingredients", []), source.get("steps", [])])
+    return compact_source(source)
+
+
+class NearDuplicateFilter:
+    """Keeps only sources that are not near-copies of one already kept"""
+
+    def __init__(self, threshold: float = 0.7, hasher: MinHasher = None):
+        self.threshold = threshold
+        self.hasher = hasher or MinHasher()
+        self._signatures: List[Tuple[int, ...]] = []
+
+    def add(self, source: Union[str, Dict]) -> bool:
+        """Record the source and return True if it is distinct from everything seen so far"""
+        signature = self.hasher.signature(_fingerprint_text(source))
+        if any(self.hasher.similarity(signature, seen) >= self.threshold for seen in self._signatures):
+            return False
+        self._signatures.append(signature)
+        return True
@@ -0,0 +1,201 @@
+import math
+import os
+import time
+from typing import Dict, List, Optional
+
+from cache import _SqliteStore, cache_dir
+from host_scheduler import HostScheduler
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class DomainHealth(_SqliteStore):
+    """Persistent per-domain scrape statistics with a circuit breaker.
+
+    Tracks moving averages of success rate, fetch latency and extracted
+    content size for each domain. A domain that keeps failing (errors,
+    blocks, timeouts or empty extractions) has its circuit opened and is
+    skipped until a cooldown passes. After that, one probe request decides
+    whether it closes again or stays open for a longer cooldown.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS domain_health (
+        domain TEXT PRIMARY KEY,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        successes INTEGER NOT NULL DEFAULT 0,
+        success_rate REAL NOT NULL DEFAULT 0.5,
+        latency REAL,
+        yield_chars REAL,
+        consecutive_failures INTEGER NOT NULL DEFAULT 0,
+        state TEXT NOT NULL DEFAULT 'closed',
+        opened_at REAL,
+        cooldown REAL,
+        probe_started_at REAL,
+        updated_at REAL NOT NULL
+    );
+    """
+
+    # Weight of the newest observation in the moving averages
+    ALPHA = 0.3
+    # A probe that hasn't reported back by then is presumed lost
+    PROBE_TIMEOUT = 300
+
+    def __init__(self, path: str = None, failure_threshold: int = None, cooldown_seconds: float = None):
+        super().__init__(path or os.path.join(cache_dir(), "domain_health.sqlite"))
+        self.failure_threshold = failure_threshold or int(os.getenv("DOMAIN_FAILURE_THRESHOLD", 3))
+        self.cooldown_seconds = cooldown_seconds or float(os.getenv("DOMAIN_COOLDOWN_HOURS", 6)) * 3600
+        self.max_cooldown_seconds = float(os.getenv("DOMAIN_MAX_COOLDOWN_HOURS", 168)) * 3600
+
+    @staticmethod
+    def domain_of(url: str) -> str:
+        return HostScheduler.host_of(url)
+
+    def _fetch_row(self, domain: str) -> Optional[Dict]:
+        """Read a domain's row; the caller holds self._lock"""
+        rows = self._conn.execute("SELECT * FROM domain_health WHERE domain = ?", (domain,)).fetchall()
+        if not rows:
+            return None
+        columns = [
+            "domain", "attempts", "successes", "success_rate", "latency", "yield_chars",
+            "consecutive_failures", "state", "opened_at", "cooldown", "probe_started_at", "updated_at",
+        ]
+        return dict(zip(columns, rows[0]))
+
+    def _row(self, domain: str) -> Optional[Dict]:
+        with self._lock:
+            return self._fetch_row(domain)
+
+    def available(self, url: str) -> bool:
+        """Whether the domain could be scraped now, without claiming its probe slot"""
+        row = self._row(self.domain_of(url))
+        if not row or row["state"] == CLOSED:
+            return True
+        now = time.time()
+        if row["state"] == OPEN and now - row["opened_at"] < row["cooldown"]:
+            return False
+        return row["probe_started_at"] is None or row["probe_started_at"] < now - self.PROBE_TIMEOUT
+
+    def allow(self, url: str) -> bool:
+        """Whether the domain may be scraped now; claims the probe slot for a cooled-down domain.
+
+        Call it when the request is about to be sent, and release() the probe
+        if the request is then abandoned without an outcome to record.
+        """
+        domain = self.domain_of(url)
+        row = self._row(domain)
+        if not row or row["state"] == CLOSED:
+            return True
+
+        now = time.time()
+        if row["state"] == OPEN and now - row["opened_at"] < row["cooldown"]:
+            return False
+
+        # Cooldown over: let exactly one probe through at a time
+        with self._lock:
+            claimed = self._conn.execute(
+                "UPDATE domain_health SET state = ?, probe_started_at = ? "
+                "WHERE domain = ? AND (probe_started_at IS NULL OR probe_started_at < ?)",
+                (HALF_OPEN, now, domain, now - self.PROBE_TIMEOUT),
+            ).rowcount
+            self._conn.commit()
+        return bool(claimed)
+
+    def release(self, url: str):
+        """Free a claimed probe slot whose request was cancelled, so the next scrape can probe"""
+        self._execute(
+            "UPDATE domain_health SET probe_started_at = NULL WHERE domain = ? AND state = ?",
+            (self.domain_of(url), HALF_OPEN),
+        )
+
+    def record(self, url: str, success: bool, latency: float = None, yield_chars: int = 0):
+        """Record one scrape outcome. An empty extraction counts as a failure."""
+        domain = self.domain_of(url)
+        success = success and yield_chars > 0
+        with self._lock:
+            # One transaction, so concurrent records for a domain don't overwrite each other
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._record(domain, success, latency, yield_chars)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def _record(self, domain: str, success: bool, latency: Optional[float], yield_chars: int):
+        now = time.time()
+        row = self._fetch_row(domain) or {
+            "attempts": 0, "successes": 0, "success_rate": 0.5, "latency": None, "yield_chars": None,
+            "consecutive_failures": 0, "state": CLOSED, "opened_at": None, "cooldown": None,
+        }
+
+        def ewma(previous, value):
+            return value if previous is None else (1 - self.ALPHA) * previous + self.ALPHA * value
+
+        success_rate = ewma(row["success_rate"], 1.0 if success else 0.0)
+        latency_avg = ewma(row["latency"], latency) if latency is not None else row["latency"]
+        yield_avg = ewma(row["yield_chars"], yield_chars)
+        state, opened_at, cooldown = row["state"], row["opened_at"], row["cooldown"]
+
+        if success:
+            consecutive = 0
+            state, cooldown = CLOSED, None
+        else:
+            consecutive = row["consecutive_failures"] + 1
+            if state == HALF_OPEN:
+                # Failed probe: stay out longer next time
+                state, opened_at = OPEN, now
+                cooldown = min((cooldown or self.cooldown_seconds) * 2, self.max_cooldown_seconds)
+            elif consecutive >= self.failure_threshold:
+                state, opened_at, cooldown = OPEN, now, self.cooldown_seconds
+
+        self._conn.execute(
+            "INSERT OR REPLACE INTO domain_health "
+            "(domain, attempts, successes, success_rate, latency, yield_chars, consecutive_failures, "
+            "state, opened_at, cooldown, probe_started_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, ?)",
+            (domain, row["attempts"] + 1, row["successes"] + int(success), success_rate, latency_avg,
+             yield_avg, consecutive, state, opened_at, cooldown, now),
+        )
+
+    def score(self, url: str) -> float:
+        """Expected usefulness of a domain: success rate and content yield, discounted by latency"""
+        row = self._row(self.domain_of(url))
+        if not row or row["attempts"] == 0:
+            return 0.5  # Unknown domains sit in the middle so they still get tried
+        yield_factor = math.log1p(row["yield_chars"] or 0) / math.log1p(20000)
+        latency_penalty = 1 + (row["latency"] or 0) / 10
+        return row["success_rate"] * (0.5 + min(yield_factor, 1.0)) / latency_penalty
+
+    def rank(self, results: List[Dict]) -> List[Dict]:
+        """Order search results by domain score, dropping domains whose circuit is open"""
+        allowed = [result for result in results if self.available(result['href'])]
+        skipped = len(results) - len(allowed)
+        if skipped:
+            print(f"   🚫 Skipping {skipped} result(s) from unhealthy domains")
+        return sorted(allowed, key=lambda result: self.score(result['href']), reverse=True)
+
+    def report(self, limit: int = 20) -> List[Dict]:
+        """Worst domains first, for spotting sites to exclude from search"""
+        rows = self._execute(
+            "SELECT domain, attempts, success_rate, latency, yield_chars, state FROM domain_health "
+            "ORDER BY success_rate ASC, attempts DESC LIMIT ?",
+            (limit,),
+        )
+        keys = ["domain", "attempts", "success_rate", "latency", "yield_chars", "state"]
+        return [dict(zip(keys, row)) for row in rows]
+
+
+def main():
+    """Print the least healthy domains"""
+    health = DomainHealth()
+    print(f"{'DOMAIN':40} {'TRIES':>5} {'OK%':>5} {'LAT(s)':>7} {'YIELD':>7}  STATE")
+    for row in health.report():
+        print(
+            f"{row['domain'][:40]:40} {row['attempts']:>5} {row['success_rate'] * 100:>5.0f} "
+            f"{(row['latency'] or 0):>7.1f} {(row['yield_chars'] or 0):>7.0f}  {row['state']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
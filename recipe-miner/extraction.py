@@ -0,0 +1,61 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import trafilatura
+
+from structured_data import extract_structured_recipe
+
+Extracted = Tuple[Optional[Dict], Optional[str]]
+
+
+def extract_page(html: str) -> Extracted:
+    """Parse one page into (structured_recipe, text); at most one of them is set.
+
+    Module-level so workers can look it up by name. Note that forkserver
+    workers still re-import the entry script, so miner_v4's import-time
+    setup (loading .env, configuring Gemini) runs once per worker when the
+    pool starts, although extraction itself uses none of it.
+    """
+    structured = extract_structured_recipe(html)
+    if structured:
+        return structured, None
+    return None, trafilatura.extract(html)
+
+
+class ExtractionPool:
+    """Runs the CPU-bound HTML parsing in a process pool.
+
+    Fetch threads hand over raw HTML and block only on their own result,
+    so parsing scales with cores instead of serializing on one. With one
+    worker (or fewer) extraction runs inline.
+    """
+
+    def __init__(self, workers: int = None):
+        self.workers = workers if workers is not None else int(
+            os.getenv("MINER_EXTRACT_WORKERS", os.cpu_count() or 1)
+        )
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # The pool starts from fetch threads; forking a threaded process can deadlock the children
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("forkserver")
+                )
+            return self._pool
+
+    def extract(self, html: str) -> Extracted:
+        if self.workers <= 1:
+            return extract_page(html)
+        return self._executor().submit(extract_page, html).result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
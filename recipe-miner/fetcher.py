@@ -0,0 +1,140 @@
+import codecs
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import urllib3
+
+USER_AGENT = "Mozilla/5.0 (compatible; CulinovaRecipeMiner/1.0)"
+
+try:
+    import brotli  # noqa: F401  (urllib3 decodes br responses when available)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="text/html; charset=...">
+META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]+)""", re.IGNORECASE)
+BOMS = [(codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16")]
+
+
+class FetchError(Exception):
+    """A page could not be fetched within the fetcher's limits"""
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int
+    html: Optional[str]
+    headers: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+
+class Fetcher:
+    """Pooled keep-alive HTTP client shared by every scrape in a run.
+
+    Connections are reused per host, responses are read as a stream with a
+    hard cap on body size, and every request is bounded by connect/read
+    timeouts plus an overall deadline, so one slow server can't stall a dish.
+    """
+
+    def __init__(self, connect_timeout: float = None, read_timeout: float = None,
+                 total_timeout: float = None, max_bytes: int = None, pool_size: int = None):
+        self.connect_timeout = connect_timeout or float(os.getenv("FETCH_CONNECT_TIMEOUT", 5))
+        self.read_timeout = read_timeout or float(os.getenv("FETCH_READ_TIMEOUT", 10))
+        self.total_timeout = total_timeout or float(os.getenv("FETCH_TOTAL_TIMEOUT", 20))
+        self.max_bytes = max_bytes or int(float(os.getenv("FETCH_MAX_MB", 5)) * 1024 * 1024)
+        self.http = urllib3.PoolManager(
+            num_pools=int(os.getenv("FETCH_MAX_HOSTS", 100)),
+            maxsize=pool_size or int(os.getenv("FETCH_POOL_SIZE", 4)),
+            block=False,
+            timeout=urllib3.Timeout(connect=self.connect_timeout, read=self.read_timeout),
+            # No overall cap: redirects and connect retries each have their own budget
+            retries=urllib3.Retry(total=None, connect=1, read=0, redirect=5, status=0, other=0),
+            headers={"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING},
+        )
+
+    def fetch(self, url: str, headers: Dict[str, str] = None,
+              cancel: Optional[threading.Event] = None) -> FetchResult:
+        """GET a page. A 304 result has html=None; errors and oversize bodies raise FetchError.
+
+        Setting `cancel` aborts the read between chunks.
+        """
+        started = time.monotonic()
+        try:
+            response = self.http.request("GET", url, headers=headers, preload_content=False)
+        except urllib3.exceptions.HTTPError as e:
+            raise FetchError(f"{type(e).__name__}: {e}") from e
+
+        try:
+            response_headers = dict(response.headers)
+            if response.status == 304:
+                return FetchResult(url, 304, None, response_headers, time.monotonic() - started)
+            if response.status >= 400:
+                raise FetchError(f"HTTP {response.status}")
+
+            declared = response.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > self.max_bytes:
+                raise FetchError(f"Body too large ({declared} bytes)")
+
+            chunks = []
+            size = 0
+            for chunk in response.stream(64 * 1024, decode_content=True):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise FetchError(f"Body exceeds {self.max_bytes} bytes")
+                if time.monotonic() - started > self.total_timeout:
+                    raise FetchError(f"Exceeded {self.total_timeout}s deadline")
+                if cancel is not None and cancel.is_set():
+                    raise FetchError("Cancelled")
+                chunks.append(chunk)
+        except (FetchError, urllib3.exceptions.HTTPError) as e:
+            # Don't hand a half-read connection back to the pool
+            response.close()
+            if isinstance(e, FetchError):
+                raise
+            raise FetchError(f"{type(e).__name__}: {e}") from e
+        finally:
+            response.release_conn()
+
+        body = b"".join(chunks)
+        html = body.decode(self._charset(response.headers.get("Content-Type", ""), body), errors="replace")
+        return FetchResult(url, response.status, html, response_headers, time.monotonic() - started)
+
+    @staticmethod
+    def _known(charset: str) -> Optional[str]:
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            return None
+
+    @classmethod
+    def _charset(cls, content_type: str, body: bytes) -> str:
+        """Encoding of a page: byte order mark, then Content-Type, then <meta charset>, then a guess"""
+        for bom, charset in BOMS:
+            if body.startswith(bom):
+                return charset
+        for part in content_type.split(";"):
+            key, _, value = part.strip().partition("=")
+            if key.lower() == "charset" and value:
+                charset = cls._known(value.strip('"\' '))
+                if charset:
+                    return charset
+                break
+        match = META_CHARSET.search(body[:4096])
+        charset = match and cls._known(match.group(1).decode("ascii"))
+        if charset:
+            return charset
+        try:
+            body.decode("utf-8")
+            return "utf-8"
+        except UnicodeDecodeError:
+            # Undeclared and not UTF-8: most likely a legacy Western page
+            return "cp1252"
+
+    def close(self):
+        self.http.clear()
@@ -0,0 +1,57 @@
+import os
+from typing import Callable, Optional, TypeVar
+
+from cache import LLMCache
+from compaction import estimate_tokens
+from rate_limiter import RateLimiter
+
+T = TypeVar("T")
+
+
+class GeminiClient:
+    """Wraps a Gemini model with the local response cache and shared rate limiter.
+
+    Responses are only cached once `parse` accepts them, so a malformed
+    answer is never replayed on the next run. Cache hits never touch the
+    rate limiter.
+    """
+
+    def __init__(self, model, cache: Optional[LLMCache] = None, limiter: Optional[RateLimiter] = None):
+        self.model = model
+        self.model_name = getattr(model, "model_name", str(model))
+        self.cache = cache
+        self.limiter = limiter
+        self.output_token_estimate = int(os.getenv("GEMINI_OUTPUT_TOKEN_ESTIMATE", 2048))
+
+    def generate_json(self, prompt: str, temperature: float, parse: Callable[[str], T]) -> T:
+        """Request a JSON response and return parse(response_text)"""
+        if self.cache:
+            cached = self.cache.get(self.model_name, temperature, prompt)
+            if cached is not None:
+                try:
+                    return parse(cached)
+                except Exception:
+                    pass  # Schema changed since it was cached; fetch a fresh answer
+
+        def request():
+            return self.model.generate_content(
+                prompt,
+                generation_config={
+                    "response_mime_type": "application/json",
+                    "temperature": temperature
+                }
+            )
+
+        if self.limiter:
+            estimated = estimate_tokens(prompt) + self.output_token_estimate
+            result = self.limiter.call(request, estimated_tokens=estimated)
+            usage = getattr(result, "usage_metadata", None)
+            if usage and getattr(usage, "total_token_count", None):
+                self.limiter.adjust_tokens(usage.total_token_count - estimated)
+        else:
+            result = request()
+        parsed = parse(result.text)
+
+        if self.cache:
+            self.cache.put(self.model_name, temperature, prompt, result.text)
+        return parsed
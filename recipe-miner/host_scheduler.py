@@ -0,0 +1,91 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+
+class _HostState:
+    """Politeness bookkeeping for a single host"""
+
+    def __init__(self, max_connections: int):
+        self.lock = threading.Lock()
+        self.connections = threading.Semaphore(max_connections)
+        self.next_allowed = 0.0
+
+
+class HostScheduler:
+    """Per-host politeness for scraping.
+
+    Requests to the same host are spaced at least `min_interval` seconds apart
+    and capped at `max_connections` in flight. Requests to different hosts
+    never wait on each other.
+    """
+
+    def __init__(self, min_interval: float = 1.0, max_connections: int = 1):
+        self.min_interval = min_interval
+        self.max_connections = max_connections
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        """Normalized host key for a URL"""
+        host = urlparse(url).netloc.lower()
+        return host[4:] if host.startswith("www.") else host
+
+    def _state(self, host: str) -> _HostState:
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = _HostState(self.max_connections)
+            return self._hosts[host]
+
+    @staticmethod
+    def _abandoned(cancel: Optional[threading.Event], deadline: Optional[float], at: float) -> bool:
+        return (cancel is not None and cancel.is_set()) or (deadline is not None and at >= deadline)
+
+    def _acquire(self, state: _HostState, cancel: Optional[threading.Event], deadline: Optional[float]) -> bool:
+        """Take a connection slot, giving up if the request is cancelled or its deadline passes first"""
+        if cancel is None and deadline is None:
+            state.connections.acquire()
+            return True
+        while not state.connections.acquire(timeout=0.1):
+            if self._abandoned(cancel, deadline, time.monotonic()):
+                return False
+        return True
+
+    @contextmanager
+    def slot(self, url: str, cancel: Optional[threading.Event] = None, deadline: float = None):
+        """Block until the URL's host may be contacted, then hold a connection slot.
+
+        Yields whether the slot was granted. A request that is cancelled, or
+        could not start before `deadline` (a time.monotonic() value), is
+        refused without using up the host's politeness interval.
+        """
+        state = self._state(self.host_of(url))
+        if not self._acquire(state, cancel, deadline):
+            yield False
+            return
+        try:
+            # Reserve the next start time under the lock, sleep outside it
+            with state.lock:
+                now = time.monotonic()
+                start_at = max(now, state.next_allowed)
+                granted = not self._abandoned(cancel, deadline, start_at)
+                if granted:
+                    previous, state.next_allowed = state.next_allowed, start_at + self.min_interval
+            delay = start_at - now
+            if granted and delay > 0:
+                if cancel is not None:
+                    cancel.wait(delay)
+                else:
+                    time.sleep(delay)
+            if granted and cancel is not None and cancel.is_set():
+                # Hand the unused interval back unless another request already queued behind it
+                with state.lock:
+                    if state.next_allowed == start_at + self.min_interval:
+                        state.next_allowed = previous
+                granted = False
+            yield granted
+        finally:
+            state.connections.release()
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from cache import _SqliteStore, cache_dir
+
+
+def recipe_hash(recipe: Dict) -> str:
+    """Stable content hash of a recipe: the same recipe hashes the same regardless of key order"""
+    canonical = json.dumps(recipe, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ValidationLedger(_SqliteStore):
+    """Verdicts already reached for a recipe, keyed by content hash and validator version.
+
+    The version covers the judge prompt, model and local rules, so changing
+    any of them re-validates everything while an unchanged recipe under the
+    same validator reuses its verdict.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS validation_ledger (
+        recipe_hash TEXT NOT NULL,
+        validator_version TEXT NOT NULL,
+        status TEXT NOT NULL,
+        reason TEXT NOT NULL,
+        validated_at TEXT NOT NULL,
+        PRIMARY KEY (recipe_hash, validator_version)
+    );
+    """
+
+    def __init__(self, validator_version: str, path: str = None):
+        super().__init__(path or os.path.join(cache_dir(), "validation_ledger.sqlite"))
+        self.validator_version = validator_version
+
+    def get_many(self, hashes: List[str]) -> Dict[str, Dict]:
+        """Prior qa_meta for each hash that has one"""
+        found = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            rows = self._execute(
+                f"SELECT recipe_hash, status, reason, validated_at FROM validation_ledger "
+                f"WHERE validator_version = ? AND recipe_hash IN ({','.join('?' * len(chunk))})",
+                (self.validator_version, *chunk),
+            )
+            for digest, status, reason, validated_at in rows:
+                found[digest] = {"status": status, "reason": reason, "validated_at": validated_at}
+        return found
+
+    def get(self, digest: str) -> Optional[Dict]:
+        return self.get_many([digest]).get(digest)
+
+    def put(self, digest: str, qa_meta: Dict):
+        self._execute(
+            "INSERT OR REPLACE INTO validation_ledger "
+            "(recipe_hash, validator_version, status, reason, validated_at) VALUES (?, ?, ?, ?, ?)",
+            (digest, self.validator_version, qa_meta["status"], qa_meta["reason"], qa_meta["validated_at"]),
+        )
+
+
+class UploadLedger(_SqliteStore):
+    """Recipes already uploaded to a space, keyed by content hash.
+
+    Lets a rerun skip everything a previous run sent without asking the
+    database; the unique content_hash index still catches anything the
+    ledger misses.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS upload_ledger (
+        recipe_hash TEXT NOT NULL,
+        space_id TEXT NOT NULL,
+        recipe_id TEXT NOT NULL,
+        batch_id TEXT,
+        uploaded_at TEXT NOT NULL,
+        PRIMARY KEY (recipe_hash, space_id)
+    );
+    """
+
+    def __init__(self, space_id: str, path: str = None):
+        super().__init__(path or os.path.join(cache_dir(), "upload_ledger.sqlite"))
+        self.space_id = space_id
+
+    def get_many(self, hashes: List[str]) -> Dict[str, str]:
+        """Recipe ID for each hash already uploaded to the space"""
+        found = {}
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            rows = self._execute(
+                f"SELECT recipe_hash, recipe_id FROM upload_ledger "
+                f"WHERE space_id = ? AND recipe_hash IN ({','.join('?' * len(chunk))})",
+                (self.space_id, *chunk),
+            )
+            found.update(rows)
+        return found
+
+    def put(self, digest: str, recipe_id: str, batch_id: str):
+        self._execute(
+            "INSERT OR REPLACE INTO upload_ledger "
+            "(recipe_hash, space_id, recipe_id, batch_id, uploaded_at) VALUES (?, ?, ?, ?, ?)",
+            (digest, self.space_id, recipe_id, batch_id, datetime.now().isoformat()),
+        )
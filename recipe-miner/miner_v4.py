@@ -1,13 +1,25 @@
 import os
 import json
 import time
-from typing import List, Literal
+import asyncio
+import argparse
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Literal, Optional, Tuple, Union
 from datetime import datetime
 from pydantic import BaseModel, Field
 from ddgs import DDGS
-import trafilatura
 import google.generativeai as genai
 from dotenv import load_dotenv
+from host_scheduler import HostScheduler
+from domain_health import DomainHealth
+from cache import CachedPage, LLMCache, ScrapeCache, SearchCache
+from gemini import GeminiClient
+from rate_limiter import get_rate_limiter
+from compaction import compact_sources, estimate_tokens
+from extraction import ExtractionPool
+from fetcher import Fetcher, FetchResult
+from dedup import NearDuplicateFilter
 
 # Load environment variables
 load_dotenv()
@@ -44,34 +56,366 @@ class RecipeSchema(BaseModel):
     ingredients: List[IngredientInput] = Field(description="List of ingredients")
     steps: List[StepInput] = Field(description="Step-by-step instructions")
 
+class StreamingBatchWriter:
+    """Appends recipes to a JSONL batch as soon as they are generated.
+    
+    A sidecar checkpoint file lists the dishes already written, so an
+    interrupted run can be resumed without redoing finished dishes.
+    """
+    
+    def __init__(self, output_dir: str, resume_path: str = None):
+        if resume_path and not resume_path.endswith(".jsonl"):
+            raise ValueError(f"Only a streamed .jsonl batch can be resumed, not {resume_path}")
+        self.path = resume_path or f"{output_dir}/batch_{int(time.time())}.jsonl"
+        self.checkpoint_path = self.path[:-len(".jsonl")] + ".checkpoint"
+        self.completed = set()
+        self.count = 0
+        self._lock = threading.Lock()
+        
+        if resume_path:
+            self._recover()
+    
+    def _recover(self):
+        """Load the checkpoint and drop any recipe lines written after the last checkpointed dish"""
+        if not os.path.exists(self.path):
+            return
+        if not os.path.exists(self.checkpoint_path):
+            # Without a checkpoint there is no telling which lines are complete; leave the batch alone
+            raise ValueError(f"No checkpoint {self.checkpoint_path} for {self.path}; cannot resume it")
+        
+        with open(self.checkpoint_path) as f:
+            checkpointed = [line.rstrip("\n") for line in f if line.strip()]
+        # A dish listed twice has two recipe lines, so trim by checkpoint lines, not distinct dishes
+        self.completed = set(checkpointed)
+        
+        # A crash between the recipe write and the checkpoint write leaves an
+        # orphan (or partial) line; trim it so the resumed dish isn't duplicated
+        tmp_path = self.path + ".tmp"
+        with open(self.path) as src, open(tmp_path, "w") as dst:
+            for line in src:
+                if self.count >= len(checkpointed) or not line.endswith("\n"):
+                    break
+                dst.write(line)
+                self.count += 1
+        os.replace(tmp_path, self.path)
+    
+    def is_done(self, dish: str) -> bool:
+        return dish in self.completed
+    
+    def append(self, dish: str, recipe: Dict):
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(recipe) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self.checkpoint_path, "a") as f:
+                f.write(dish + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.completed.add(dish)
+            self.count += 1
+    
+    def finalize(self) -> Optional[str]:
+        """Convert the JSONL stream into the regular batch JSON, one recipe in memory at a time"""
+        if not self.count:
+            return None
+        
+        json_path = self.path[:-len(".jsonl")] + ".json"
+        with open(self.path) as src, open(json_path, "w") as dst:
+            dst.write("[\n")
+            for idx, line in enumerate(src):
+                if idx:
+                    dst.write(",\n")
+                # Same layout json.dump(..., indent=2) gives the non-streaming batches
+                item = json.dumps(json.loads(line), indent=2)
+                dst.write("\n".join("  " + row for row in item.split("\n")))
+            dst.write("\n]")
+        return json_path
+
+class GenerationBatcher:
+    """Groups dishes that finish scraping around the same time into one batched generation call.
+    
+    A batch is sent once it is full, or after `linger` seconds so a slow
+    trickle of dishes never waits indefinitely.
+    """
+    
+    def __init__(self, miner: "RecipeMiner", persona: str, batch_size: int,
+                 semaphore: asyncio.Semaphore, linger: float = 2.0):
+        self.miner = miner
+        self.persona = persona
+        self.batch_size = batch_size
+        self.semaphore = semaphore
+        self.linger = linger
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+    
+    async def submit(self, dish: str, sources: List[Union[str, Dict]]) -> Optional["RecipeSchema"]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((dish, sources, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.linger, self._flush)
+        return await future
+    
+    def _flush(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, batch: list):
+        try:
+            async with self.semaphore:
+                recipes = await asyncio.to_thread(
+                    self.miner.generate_recipes_batch,
+                    [(dish, sources) for dish, sources, _ in batch],
+                    self.persona
+                )
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, _, future), recipe in zip(batch, recipes):
+            future.set_result(recipe)
+
 class RecipeMiner:
     """Generates recipes using AI consensus from multiple sources"""
     
-    def __init__(self):
+    def __init__(self, search_concurrency: int = None, scrape_concurrency: int = None,
+                 generate_concurrency: int = None, use_cache: bool = True,
+                 source_token_budget: int = None, generate_batch_size: int = None,
+                 extract_workers: int = None):
         self.searcher = DDGS()
         self.output_dir = "draft_recipes"
         os.makedirs(self.output_dir, exist_ok=True)
+        
+        # Per-stage limits for concurrent mode
+        self.search_concurrency = search_concurrency or int(os.getenv("MINER_SEARCH_CONCURRENCY", 2))
+        self.scrape_concurrency = scrape_concurrency or int(os.getenv("MINER_SCRAPE_CONCURRENCY", 8))
+        self.generate_concurrency = generate_concurrency or int(os.getenv("MINER_GENERATE_CONCURRENCY", 4))
+        
+        # Dishes per Gemini call; 1 keeps the classic one-call-per-dish behaviour
+        self.generate_batch_size = generate_batch_size or int(os.getenv("MINER_GENERATE_BATCH_SIZE", 1))
+        
+        # Search over-fetches so near-duplicate sources can be replaced
+        self.sources_per_dish = int(os.getenv("MINER_SOURCES_PER_DISH", 3))
+        self.search_results = int(os.getenv("MINER_SEARCH_RESULTS", 6))
+        self.duplicate_threshold = float(os.getenv("MINER_DUPLICATE_THRESHOLD", 0.7))
+        # Wall-clock cap on scraping for one dish; it proceeds with whatever arrived
+        self.dish_deadline = float(os.getenv("MINER_DISH_DEADLINE", 45))
+        
+        # Total prompt tokens shared by all sources of one dish
+        self.source_token_budget = source_token_budget or int(os.getenv("MINER_SOURCE_TOKEN_BUDGET", 6000))
+        
+        # Shared across all dishes so politeness holds even when dishes overlap
+        self.scheduler = HostScheduler(
+            min_interval=float(os.getenv("MINER_HOST_MIN_INTERVAL", 1.0)),
+            max_connections=int(os.getenv("MINER_HOST_MAX_CONNECTIONS", 1))
+        )
+        
+        # Remembers which sites block, stall or yield nothing, across runs
+        self.domain_health = DomainHealth()
+        # Candidates from domains scoring below this are only scraped as a fallback
+        self.domain_min_score = float(os.getenv("DOMAIN_MIN_SCORE", 0.2))
+        
+        # One pooled keep-alive client for every page in the run
+        self.fetcher = Fetcher()
+        
+        # HTML parsing is CPU-bound; keep it off the fetch threads
+        self.extractor = ExtractionPool(extract_workers)
+        
+        # Local caches make re-runs free for unchanged pages
+        self.scrape_cache = ScrapeCache() if use_cache else None
+        self.search_cache = SearchCache() if use_cache else None
+        self.llm = GeminiClient(model, LLMCache() if use_cache else None, get_rate_limiter())
+    
+    def search_recipes(self, dish: str, max_results: int = None) -> List[Dict]:
+        """Search the web for source recipes for a dish, served from cache when possible"""
+        max_results = max_results or self.search_results
+        query = f"authentic {dish} recipe -site:youtube.com -site:pinterest.com"
+        
+        if self.search_cache:
+            cached = self.search_cache.get(query, max_results)
+            if cached is not None:
+                return cached
+        
+        results = list(self.searcher.text(query, max_results=max_results))
+        
+        # Only cache hits; an empty result is often a throttled request
+        if self.search_cache and results:
+            self.search_cache.put(query, max_results, results)
+        return results
+    
+    def prefetch_searches(self, dish_list: List[str]) -> int:
+        """Warm the search cache for a whole menu, returning how many dishes have results"""
+        if not self.search_cache:
+            return 0
+        
+        print(f"🔍 Prefetching searches for {len(dish_list)} dishes...")
+        
+        def prefetch(dish: str) -> bool:
+            try:
+                return bool(self.search_recipes(dish))
+            except Exception as e:
+                print(f"   ❌ Search failed for {dish}: {e}")
+                return False
+        
+        with ThreadPoolExecutor(max_workers=self.search_concurrency) as pool:
+            found = sum(pool.map(prefetch, dish_list))
+        
+        print(f"   ✅ {found}/{len(dish_list)} dishes cached")
+        return found
+    
+    def collect_sources(self, results: List[Dict]) -> List[Union[str, Dict]]:
+        """Scrape candidates concurrently and keep the first distinct sources to arrive.
+        
+        Every candidate URL is scraped at once (same-host requests still queue
+        behind the politeness scheduler). As soon as enough distinct sources are
+        in, or the per-dish deadline passes, the remaining scrapes are cancelled.
+        Near-duplicate pages, such as syndicated copies of one article, are
+        collapsed and don't count towards the target.
+        
+        Candidates are ranked by domain health first: domains with an open
+        circuit are skipped, and poorly scoring ones are held back and only
+        scraped if the healthy candidates don't yield enough sources.
+        """
+        ranked = self.domain_health.rank(results)
+        urls = [result['href'] for result in ranked]
+        if not urls:
+            return []
+        preferred = [url for url in urls if self.domain_health.score(url) >= self.domain_min_score]
+        # Scores may move between rank() and here, so split by membership rather than position
+        preferred_set = set(preferred)
+        reserve = [url for url in urls if url not in preferred_set] if preferred else []
+        preferred = preferred or urls
+        
+        duplicates = NearDuplicateFilter(self.duplicate_threshold)
+        sources = []
+        collapsed = 0
+        cancel = threading.Event()
+        deadline = time.monotonic() + self.dish_deadline
+        
+        pool = ThreadPoolExecutor(max_workers=len(urls))
+        pending = {pool.submit(self.scrape_content, url, cancel, deadline) for url in preferred}
+        try:
+            while len(sources) < self.sources_per_dish:
+                if not pending:
+                    if not reserve:
+                        break
+                    pending = {pool.submit(self.scrape_content, url, cancel, deadline) for url in reserve}
+                    reserve = []
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print(f"   ⏱️ Dish deadline reached with {len(sources)} source(s)")
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    content = future.result()
+                    if not content or len(sources) >= self.sources_per_dish:
+                        continue
+                    if duplicates.add(content):
+                        sources.append(content)
+                    else:
+                        collapsed += 1
+        finally:
+            # Stop in-flight reads and drop scrapes that never started
+            cancel.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        if collapsed:
+            print(f"   🧬 Collapsed {collapsed} near-duplicate source(s)")
+        return sources
+    
+    def fetch_page(self, url: str, cached: Optional[CachedPage] = None,
+                   cancel: Optional[threading.Event] = None) -> FetchResult:
+        """Download a page, revalidating against a cached copy when possible.
+        
+        A 304 status means the cached copy is still current and no body was
+        transferred.
+        """
+        headers = {}
+        if cached:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        return self.fetcher.fetch(url, headers=headers, cancel=cancel)
     
-    def scrape_content(self, url: str) -> str:
-        """Extract main content from a URL"""
+    def scrape_content(self, url: str, cancel: Optional[threading.Event] = None,
+                       deadline: float = None) -> Union[str, Dict, None]:
+        """Extract main content from a URL
+        
+        Pages with schema.org Recipe JSON-LD or microdata return that structured
+        recipe (skipping trafilatura); all others return the extracted text.
+        Setting `cancel` abandons the scrape once the dish no longer needs it,
+        and a scrape that can't start before `deadline` (time.monotonic()) is skipped.
+        """
         try:
-            downloaded = trafilatura.fetch_url(url)
+            cached = self.scrape_cache.get(url) if self.scrape_cache else None
+            if cached and cached.is_fresh:
+                return cached.structured or cached.text
+            
+            # Per-host politeness: only same-server requests wait on each other
+            with self.scheduler.slot(url, cancel, deadline) as granted:
+                # The domain's recovery probe is only claimed once the request really starts
+                if not granted or not self.domain_health.allow(url):
+                    return None
+                page = self.fetch_page(url, cached, cancel)
+            downloaded, headers = page.html, page.headers
+            
+            if page.status == 304 and cached:
+                self.scrape_cache.mark_revalidated(url)
+                result = cached.structured or cached.text
+                self.domain_health.record(url, True, page.elapsed, self._content_size(result))
+                return result
+            
+            structured, content = None, None
             if downloaded:
-                content = trafilatura.extract(downloaded)
-                if content:
-                    return content[:10000]  # Limit to prevent token overflow
+                # Fast path: structured data is smaller and more exact than free text
+                structured, content = self.extractor.extract(downloaded)
+                if self.scrape_cache:
+                    self.scrape_cache.put(
+                        url, downloaded, content,
+                        etag=headers.get("ETag"),
+                        last_modified=headers.get("Last-Modified"),
+                        structured=structured
+                    )
+            # A page that loads but has nothing extractable counts against its domain
+            self.domain_health.record(url, True, page.elapsed, self._content_size(structured or content))
+            if structured or content:
+                return structured or content  # Token budget is enforced when the prompt is built
         except Exception as e:
-            print(f"   ⚠️ Failed to scrape {url}: {e}")
+            # A scrape abandoned because the dish already has its sources says nothing about the site
+            if cancel is None or not cancel.is_set():
+                print(f"   ⚠️ Failed to scrape {url}: {e}")
+                self.domain_health.record(url, False)
+            else:
+                self.domain_health.release(url)
         return None
     
-    def generate_recipe(self, dish_name: str, persona: str, sources: List[str]) -> RecipeSchema:
+    @staticmethod
+    def _content_size(content: Union[str, Dict, None]) -> int:
+        if not content:
+            return 0
+        return len(content) if isinstance(content, str) else len(json.dumps(content))
+    
+    def generate_recipe(self, dish_name: str, persona: str, sources: List[Union[str, Dict]]) -> RecipeSchema:
         """Generate a consensus recipe from multiple sources"""
         print(f"   🧠 Synthesizing consensus for '{dish_name}'...")
+        sources = self._compact(sources)
         
         prompt = f"""
         You are a Culinary Data Architect with the following persona: {persona}
         
-        TASK: Create a 'Consensus Recipe' based on the {len(sources)} source texts provided.
+        TASK: Create a 'Consensus Recipe' based on the {len(sources)} sources provided.
+        Sources are either page text or structured recipe data (name, ingredients, steps, times).
         
         REQUIREMENTS:
         1. Find the intersection of ingredients and techniques across sources
@@ -88,27 +432,142 @@ class RecipeMiner:
         """
         
         try:
-            result = model.generate_content(
+            # Slight creativity while maintaining consistency
+            recipe = self.llm.generate_json(
                 prompt,
-                generation_config={
-                    "response_mime_type": "application/json",
-                    "temperature": 0.7  # Slight creativity while maintaining consistency
-                }
+                temperature=0.7,
+                parse=lambda text: RecipeSchema(**json.loads(text))  # Validate with Pydantic
             )
-            
-            data = json.loads(result.text)
-            recipe = RecipeSchema(**data)  # Validate with Pydantic
             return recipe
             
         except Exception as e:
             print(f"   ❌ Generation failed: {e}")
             raise
     
-    def mine_recipes(self, dish_list: List[str], persona: str = "Abuela Sofia. Authentic Mexican. Warm tone.") -> str:
-        """Mine recipes for a list of dishes and save to JSON file"""
+    def _compact(self, sources: List[Union[str, Dict]]) -> List[Union[str, Dict]]:
+        """Keep ingredient/instruction sections within one budget shared by all sources"""
+        raw_tokens = sum(estimate_tokens(source) for source in sources)
+        sources = compact_sources(sources, self.source_token_budget)
+        compact_tokens = sum(estimate_tokens(source) for source in sources)
+        print(f"   ✂️  Compacted sources: ~{raw_tokens} → ~{compact_tokens} tokens")
+        return sources
+    
+    def generate_recipes_batch(self, dishes: List[Tuple[str, List[Union[str, Dict]]]],
+                               persona: str) -> List[Optional[RecipeSchema]]:
+        """Generate consensus recipes for several dishes in one Gemini call
+        
+        The persona, requirements and schema are sent once for the whole batch.
+        Each returned recipe is validated on its own; any dish that is missing
+        or invalid is retried alone with generate_recipe. Results follow the
+        input order, with None for dishes that still failed.
+        """
+        if len(dishes) == 1:
+            dish_name, sources = dishes[0]
+            try:
+                return [self.generate_recipe(dish_name, persona, sources)]
+            except Exception:
+                return [None]
+        
+        print(f"   🧠 Synthesizing consensus for {len(dishes)} dishes in one batch...")
+        dish_blocks = "\n".join(
+            f"""
+        ### DISH {idx}: {dish_name}
+        SOURCES:
+        {json.dumps(self._compact(sources), indent=2)}
+        """
+            for idx, (dish_name, sources) in enumerate(dishes)
+        )
+        
+        prompt = f"""
+        You are a Culinary Data Architect with the following persona: {persona}
+        
+        TASK: Create one 'Consensus Recipe' for EACH of the {len(dishes)} dishes below, using only that dish's sources.
+        Sources are either page text or structured recipe data (name, ingredients, steps, times).
+        
+        REQUIREMENTS (apply to every dish):
+        1. Find the intersection of ingredients and techniques across sources
+        2. Write UNIQUE instructions - do not copy-paste from sources
+        3. Ensure all ingredients in the list are used in the steps
+        4. Times should be realistic for home cooking
+        5. Difficulty should reflect actual complexity
+        
+        DISHES:
+        {dish_blocks}
+        
+        OUTPUT: A JSON array with exactly one object per dish:
+        {{"dish_index": <DISH number>, "recipe": <recipe>}}
+        where every <recipe> strictly matches this schema:
+        {json.dumps(RecipeSchema.model_json_schema(), indent=2)}
+        """
+        
+        results: List[Optional[RecipeSchema]] = [None] * len(dishes)
+        try:
+            items = self.llm.generate_json(prompt, temperature=0.7, parse=self._parse_batch_items)
+            for item in items:
+                idx = item.get("dish_index")
+                if isinstance(idx, int) and 0 <= idx < len(dishes) and results[idx] is None:
+                    try:
+                        results[idx] = RecipeSchema(**item["recipe"])  # Validate each dish separately
+                    except Exception as e:
+                        print(f"   ⚠️ Batch result for '{dishes[idx][0]}' invalid: {e}")
+        except Exception as e:
+            print(f"   ⚠️ Batch generation failed: {e}")
+        
+        # Retry whatever the batch didn't deliver, one dish at a time
+        for idx, (dish_name, sources) in enumerate(dishes):
+            if results[idx] is None:
+                try:
+                    results[idx] = self.generate_recipe(dish_name, persona, sources)
+                except Exception:
+                    pass
+        return results
+    
+    @staticmethod
+    def _parse_batch_items(text: str) -> List[Dict]:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            # Tolerate {"recipes": [...]} style wrappers
+            data = next((value for value in data.values() if isinstance(value, list)), None)
+        if not isinstance(data, list):
+            raise ValueError("Batch response is not a JSON array")
+        return [item for item in data if isinstance(item, dict)]
+    
+    def mine_recipes(self, dish_list: List[str], persona: str = "Abuela Sofia. Authentic Mexican. Warm tone.",
+                     concurrent: bool = False, stream: bool = False, resume_path: str = None) -> str:
+        """Mine recipes for a list of dishes and save to JSON file
+        
+        With stream=True each recipe is appended to a JSONL file as soon as it is
+        generated, so memory stays flat and resume_path can pick up a crashed run.
+        """
+        writer = None
+        if stream or resume_path:
+            writer = StreamingBatchWriter(self.output_dir, resume_path)
+            done = [dish for dish in dish_list if writer.is_done(dish)]
+            if done:
+                print(f"⏭️  Resuming {writer.path}: skipping {len(done)} finished dishes")
+                dish_list = [dish for dish in dish_list if not writer.is_done(dish)]
+            print(f"📝 Streaming recipes to: {writer.path}")
+        
+        if concurrent:
+            return asyncio.run(self.mine_recipes_async(dish_list, persona, writer))
+        
         generated_recipes = []
+        pending = []
         total_dishes = len(dish_list)
         
+        def generate_pending():
+            # 3. Generate consensus recipes for the dishes scraped so far
+            for (dish, _), recipe in zip(pending, self.generate_recipes_batch(pending, persona)):
+                if recipe is None:
+                    print(f"   ❌ Failed to generate recipe for {dish}")
+                    continue
+                if writer:
+                    writer.append(dish, recipe.model_dump())
+                else:
+                    generated_recipes.append(recipe.model_dump())
+                print(f"   ✅ Generated: {recipe.title}")
+            pending.clear()
+        
         print(f"\n🍳 Starting recipe mining for {total_dishes} dishes...")
         print(f"📝 Using persona: {persona}\n")
         
@@ -118,10 +577,7 @@ class RecipeMiner:
             # 1. Search for recipes
             print("   🔍 Searching for authentic recipes...")
             try:
-                results = list(self.searcher.text(
-                    f"authentic {dish} recipe -site:youtube.com -site:pinterest.com", 
-                    max_results=3
-                ))
+                results = self.search_recipes(dish)
                 
                 if not results:
                     print(f"   ⚠️ No search results for {dish}")
@@ -133,33 +589,136 @@ class RecipeMiner:
             
             # 2. Scrape content
             print("   📄 Scraping recipe content...")
-            sources = []
-            for result in results:
-                content = self.scrape_content(result['href'])
-                if content:
-                    sources.append(content)
-                time.sleep(1)  # Be respectful to servers
+            sources = self.collect_sources(results)
             
             if not sources:
                 print(f"   ⚠️ No content scraped for {dish}")
                 continue
             
-            # 3. Generate consensus recipe
-            try:
-                recipe = self.generate_recipe(dish, persona, sources)
-                generated_recipes.append(recipe.model_dump())
-                print(f"   ✅ Generated: {recipe.title}")
-                
-            except Exception as e:
-                print(f"   ❌ Failed to generate recipe for {dish}: {e}")
-                continue
-            
-            # Rate limiting
-            if idx < total_dishes:
-                print("   ⏳ Waiting 2 seconds before next recipe...")
-                time.sleep(2)
+            pending.append((dish, sources))
+            if len(pending) >= self.generate_batch_size:
+                generate_pending()
+        
+        if pending:
+            generate_pending()
         
         # 4. Save batch to file
+        if writer:
+            return self._finalize_stream(writer)
+        return self._save_batch(generated_recipes)
+    
+    async def mine_recipes_async(self, dish_list: List[str], persona: str,
+                                 writer: StreamingBatchWriter = None) -> str:
+        """Mine recipes with search, scrape and generation overlapping across dishes.
+        
+        Each stage has its own concurrency limit, so slow network I/O for one dish
+        never blocks progress on the others. Output order follows dish_list,
+        except when streaming, where recipes are written in completion order.
+        """
+        total_dishes = len(dish_list)
+        
+        print(f"\n🍳 Starting concurrent recipe mining for {total_dishes} dishes...")
+        print(f"📝 Using persona: {persona}")
+        print(f"⚙️  Concurrency: search={self.search_concurrency}, "
+              f"scrape={self.scrape_concurrency}, generate={self.generate_concurrency}, "
+              f"batch size={self.generate_batch_size}\n")
+        
+        # The blocking clients run in worker threads; size the pool so every stage can fill its slots
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(
+            max_workers=self.search_concurrency + self.scrape_concurrency + self.generate_concurrency
+        )
+        loop.set_default_executor(executor)
+        
+        stages = {
+            "search": asyncio.Semaphore(self.search_concurrency),
+            "scrape": asyncio.Semaphore(self.scrape_concurrency),
+            "generate": asyncio.Semaphore(self.generate_concurrency),
+        }
+        batcher = None
+        if self.generate_batch_size > 1:
+            batcher = GenerationBatcher(self, persona, self.generate_batch_size, stages["generate"])
+        
+        try:
+            results = await asyncio.gather(*(
+                self._mine_dish_async(idx, total_dishes, dish, persona, stages, writer, batcher)
+                for idx, dish in enumerate(dish_list, 1)
+            ))
+        finally:
+            executor.shutdown(wait=False)
+        
+        if writer:
+            return self._finalize_stream(writer)
+        
+        generated_recipes = [recipe for recipe in results if recipe is not None]
+        return self._save_batch(generated_recipes)
+    
+    async def _mine_dish_async(self, idx: int, total: int, dish: str, persona: str,
+                               stages: Dict[str, asyncio.Semaphore],
+                               writer: StreamingBatchWriter = None,
+                               batcher: GenerationBatcher = None) -> Optional[Dict]:
+        """Run one dish through search, scrape and generation"""
+        label = f"[{idx}/{total}] {dish}"
+        
+        # 1. Search for recipes
+        try:
+            async with stages["search"]:
+                results = await asyncio.to_thread(self.search_recipes, dish)
+        except Exception as e:
+            print(f"{label}: ❌ Search failed: {e}")
+            return None
+        
+        if not results:
+            print(f"{label}: ⚠️ No search results")
+            return None
+        
+        # 2. Scrape content
+        async with stages["scrape"]:
+            sources = await asyncio.to_thread(self.collect_sources, results)
+        
+        if not sources:
+            print(f"{label}: ⚠️ No content scraped")
+            return None
+        
+        # 3. Generate consensus recipe
+        try:
+            if batcher:
+                recipe = await batcher.submit(dish, sources)
+                if recipe is None:
+                    raise ValueError("no valid recipe after batch and single retries")
+            else:
+                async with stages["generate"]:
+                    recipe = await asyncio.to_thread(self.generate_recipe, dish, persona, sources)
+        except Exception as e:
+            print(f"{label}: ❌ Failed to generate recipe: {e}")
+            return None
+        
+        print(f"{label}: ✅ Generated: {recipe.title}")
+        if writer:
+            writer.append(dish, recipe.model_dump())
+            return None
+        return recipe.model_dump()
+    
+    def close(self):
+        """Stop the extraction worker processes and drop pooled connections"""
+        self.extractor.shutdown()
+        self.fetcher.close()
+        self.domain_health.close()
+    
+    def _finalize_stream(self, writer: StreamingBatchWriter) -> Optional[str]:
+        """Turn a finished JSONL stream into the batch file the validator reads"""
+        filename = writer.finalize()
+        if not filename:
+            print("\n❌ No recipes were generated")
+            return None
+        
+        print(f"\n✅ Mining complete!")
+        print(f"📦 Batch contains {writer.count} recipes")
+        print(f"💾 Saved to: {filename}")
+        return filename
+    
+    def _save_batch(self, generated_recipes: List[Dict]) -> Optional[str]:
+        """Write generated recipes to a timestamped batch file"""
         if generated_recipes:
             timestamp = int(time.time())
             filename = f"{self.output_dir}/batch_{timestamp}.json"
@@ -178,6 +737,27 @@ class RecipeMiner:
 
 def main():
     """Main execution function"""
+    parser = argparse.ArgumentParser(description="Generate consensus recipes from web sources")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="Overlap search, scrape and generation across dishes")
+    parser.add_argument("--search-concurrency", type=int, help="Max in-flight searches")
+    parser.add_argument("--scrape-concurrency", type=int, help="Max dishes scraping at once")
+    parser.add_argument("--generate-concurrency", type=int, help="Max in-flight Gemini calls")
+    parser.add_argument("--batch-size", type=int,
+                        help="Dishes to synthesize per Gemini call (failed dishes are retried alone)")
+    parser.add_argument("--extract-workers", type=int,
+                        help="Processes for HTML extraction (default: CPU count, 1 = inline)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the local scrape, search and LLM caches")
+    parser.add_argument("--prefetch-only", action="store_true",
+                        help="Warm the search cache for the menu and exit without mining")
+    parser.add_argument("--stream", action="store_true",
+                        help="Append each recipe to a JSONL file with a checkpoint as it is generated")
+    parser.add_argument("--resume", metavar="BATCH_JSONL",
+                        help="Resume a streamed run, skipping dishes already in its checkpoint")
+    args = parser.parse_args()
+    if args.resume and not args.resume.endswith(".jsonl"):
+        parser.error(f"--resume takes the streamed .jsonl batch, not {args.resume}")
+    
     # Define your niche menu here
     # Start with a small test batch
     dishes = [
@@ -194,13 +774,33 @@ def main():
     }
     
     # Create miner and run
-    miner = RecipeMiner()
+    miner = RecipeMiner(
+        search_concurrency=args.search_concurrency,
+        scrape_concurrency=args.scrape_concurrency,
+        generate_concurrency=args.generate_concurrency,
+        use_cache=not args.no_cache,
+        generate_batch_size=args.batch_size,
+        extract_workers=args.extract_workers
+    )
     
     # You can specify which persona to use
     selected_persona = personas.get("cocina", personas["cocina"])
     
+    if args.prefetch_only:
+        miner.prefetch_searches(dishes)
+        return
+    
     # Mine recipes
-    output_file = miner.mine_recipes(dishes, selected_persona)
+    try:
+        output_file = miner.mine_recipes(
+            dishes,
+            selected_persona,
+            concurrent=args.concurrent,
+            stream=args.stream,
+            resume_path=args.resume
+        )
+    finally:
+        miner.close()
     
     if output_file:
         print(f"\n🎉 Ready for validation!")
@@ -0,0 +1,187 @@
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Hard limits shared with RecipeValidator's single-recipe quick checks
+REQUIRED_FIELDS = ['title', 'description', 'ingredients', 'steps']
+MIN_INGREDIENTS = 2
+MIN_STEPS = 2
+MAX_TOTAL_MINUTES = 480
+MIN_SERVINGS = 1
+MAX_SERVINGS = 50
+
+# Approximate grams per unit. Volumes assume the density of water, which is
+# close enough to spot a recipe calling for ten cups of salt per serving.
+GRAMS_PER_UNIT = {
+    "g": 1.0, "gram": 1.0, "gr": 1.0,
+    "kg": 1000.0, "kilogram": 1000.0,
+    "mg": 0.001, "milligram": 0.001,
+    "oz": 28.35, "ounce": 28.35,
+    "lb": 453.6, "pound": 453.6,
+    "ml": 1.0, "milliliter": 1.0, "millilitre": 1.0,
+    "cl": 10.0, "dl": 100.0,
+    "l": 1000.0, "liter": 1000.0, "litre": 1000.0,
+    "tsp": 5.0, "teaspoon": 5.0,
+    "tbsp": 15.0, "tablespoon": 15.0,
+    "fl oz": 29.6, "fluid ounce": 29.6,
+    "cup": 240.0,
+    "pint": 473.0, "pt": 473.0,
+    "quart": 946.0, "qt": 946.0,
+    "gallon": 3785.0, "gal": 3785.0,
+}
+
+
+def grams_per_unit(unit: str) -> float:
+    """Grams for one of `unit`, or NaN for counts (pieces, cloves, pinches) that have no fixed weight"""
+    name = (unit or "").strip().lower().rstrip(".")
+    if name in GRAMS_PER_UNIT:
+        return GRAMS_PER_UNIT[name]
+    if name.endswith("s") and name[:-1] in GRAMS_PER_UNIT:
+        return GRAMS_PER_UNIT[name[:-1]]
+    return math.nan
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+@dataclass
+class Screening:
+    """Pre-screen outcome for one recipe"""
+    hard_failure: Optional[str] = None  # Set when the recipe can be flagged without asking the judge
+    outliers: List[str] = field(default_factory=list)  # Batch-relative anomalies
+
+
+class BatchPrescreen:
+    """Checks a whole draft batch at once on columnar arrays.
+
+    Hard rules (missing fields, impossible times or servings, absurd amounts
+    per serving, steps that take far longer than the stated time) flag a
+    recipe outright. Measures that are only suspicious relative to the rest
+    of the batch are reported as outliers using a robust z-score, so one bad
+    recipe can't shift the baseline.
+    """
+
+    def __init__(self, max_total_minutes: float = MAX_TOTAL_MINUTES, max_grams_per_serving: float = None,
+                 outlier_z: float = None, min_batch: int = None):
+        self.max_total_minutes = max_total_minutes
+        self.max_grams_per_serving = max_grams_per_serving or float(
+            os.getenv("PRESCREEN_MAX_GRAMS_PER_SERVING", 2500)
+        )
+        self.outlier_z = outlier_z or float(os.getenv("PRESCREEN_OUTLIER_Z", 3.5))
+        # Below this many recipes the batch median says little about any one recipe
+        self.min_batch = min_batch or int(os.getenv("PRESCREEN_MIN_BATCH", 10))
+
+    def _columns(self, recipes: List[Dict]) -> Dict[str, np.ndarray]:
+        prep = np.array([_number(r.get('prep_time_minutes', 0)) for r in recipes])
+        cook = np.array([_number(r.get('cook_time_minutes', 0)) for r in recipes])
+        servings = np.array([_number(r.get('servings', 0)) for r in recipes])
+        ingredient_counts = np.array([len(r.get('ingredients') or []) for r in recipes])
+        step_counts = np.array([len(r.get('steps') or []) for r in recipes])
+
+        # Flatten every ingredient and step in the batch, tagged with its recipe's row
+        ingredient_rows = np.repeat(np.arange(len(recipes)), ingredient_counts)
+        ingredients = [ing for r in recipes for ing in (r.get('ingredients') or [])]
+        amounts = np.array([_number(ing.get('amount')) for ing in ingredients], dtype=float)
+        factors = np.array([grams_per_unit(ing.get('unit')) for ing in ingredients], dtype=float)
+        grams = amounts * factors
+        weighed = np.isfinite(grams)
+
+        step_rows = np.repeat(np.arange(len(recipes)), step_counts)
+        durations = np.array(
+            [_number(step.get('duration_minutes', 0)) for r in recipes for step in (r.get('steps') or [])],
+            dtype=float
+        )
+
+        total_grams = np.bincount(ingredient_rows[weighed], weights=grams[weighed], minlength=len(recipes))
+        weighed_counts = np.bincount(ingredient_rows[weighed], minlength=len(recipes))
+        # Zero is a legitimate amount ("to taste"); missing or negative ones are not
+        bad_amounts = np.bincount(ingredient_rows[~(amounts >= 0)], minlength=len(recipes))
+        step_minutes = np.bincount(
+            step_rows[np.isfinite(durations)], weights=durations[np.isfinite(durations)], minlength=len(recipes)
+        )
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            grams_per_serving = np.where((weighed_counts > 0) & (servings > 0), total_grams / servings, np.nan)
+
+        return {
+            "prep": prep,
+            "cook": cook,
+            "total": prep + cook,
+            "servings": servings,
+            "ingredient_counts": ingredient_counts,
+            "step_counts": step_counts,
+            "grams_per_serving": grams_per_serving,
+            "bad_amounts": bad_amounts,
+            "step_minutes": step_minutes,
+        }
+
+    def _robust_z(self, values: np.ndarray) -> np.ndarray:
+        """Median/MAD z-scores; NaN where a value is missing or the batch has no spread"""
+        finite = np.isfinite(values)
+        if finite.sum() < self.min_batch:
+            return np.full(len(values), np.nan)
+        median = np.median(values[finite])
+        mad = np.median(np.abs(values[finite] - median))
+        if mad == 0:
+            return np.full(len(values), np.nan)
+        return 0.6745 * (values - median) / mad
+
+    def screen(self, recipes: List[Dict]) -> List[Screening]:
+        """Screen every recipe in the batch; results follow the input order"""
+        if not recipes:
+            return []
+        c = self._columns(recipes)
+        total, servings = c["total"], c["servings"]
+
+        # Hard rules, checked in order of precedence; the first that fails is reported
+        with np.errstate(invalid="ignore"):
+            rules = [
+                (c["ingredient_counts"] < MIN_INGREDIENTS,
+                 lambda i: f"Recipe has too few ingredients (minimum {MIN_INGREDIENTS} required)"),
+                (c["step_counts"] < MIN_STEPS, lambda i: f"Recipe has too few steps (minimum {MIN_STEPS} required)"),
+                ((c["prep"] < 0) | (c["cook"] < 0), lambda i: "Negative time values are not allowed"),
+                (total > self.max_total_minutes,
+                 lambda i: f"Total cooking time exceeds {self.max_total_minutes / 60:g} hours"),
+                (~((servings >= MIN_SERVINGS) & (servings <= MAX_SERVINGS)),
+                 lambda i: f"Number of servings must be between {MIN_SERVINGS} and {MAX_SERVINGS}"),
+                (c["bad_amounts"] > 0,
+                 lambda i: f"{c['bad_amounts'][i]} ingredient(s) have a missing or negative amount"),
+                (c["grams_per_serving"] > self.max_grams_per_serving,
+                 lambda i: f"About {c['grams_per_serving'][i]:.0f} g of ingredients per serving"),
+                ((c["step_minutes"] > 2 * total) & (c["step_minutes"] - total > 30),
+                 lambda i: f"Steps take {c['step_minutes'][i]:.0f} min but stated time is {total[i]:.0f} min"),
+            ]
+
+        results = [Screening() for _ in recipes]
+        for idx, recipe in enumerate(recipes):
+            missing = next((f for f in REQUIRED_FIELDS if not recipe.get(f)), None)
+            if missing:
+                results[idx].hard_failure = f"Missing required field: {missing}"
+        for failed, describe in rules:
+            for idx in np.flatnonzero(failed):
+                if results[idx].hard_failure is None:
+                    results[idx].hard_failure = describe(idx)
+
+        # Batch-relative outliers; log scale for measures that vary multiplicatively
+        with np.errstate(divide="ignore", invalid="ignore"):
+            measures = [
+                ("total time", np.log(np.where(total > 0, total, np.nan)), total, "min"),
+                ("amount per serving", np.log(c["grams_per_serving"]), c["grams_per_serving"], "g"),
+                ("ingredient count", c["ingredient_counts"].astype(float), c["ingredient_counts"], ""),
+                ("step count", c["step_counts"].astype(float), c["step_counts"], ""),
+            ]
+        for label, values, raw, unit in measures:
+            z = self._robust_z(values)
+            with np.errstate(invalid="ignore"):
+                flagged = np.flatnonzero(np.abs(z) > self.outlier_z)
+            for idx in flagged:
+                direction = "high" if z[idx] > 0 else "low"
+                results[idx].outliers.append(f"unusually {direction} {label} ({raw[idx]:.0f}{unit})")
+        return results
@@ -0,0 +1,187 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional, TypeVar
+
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_exponential, wait_random
+
+from cache import cache_dir
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """True for rate-limit and transient server errors from the Gemini API"""
+    code = getattr(exc, "code", None)
+    if isinstance(code, int) and code in RETRYABLE_STATUS:
+        return True
+    return type(exc).__name__ in {
+        "ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+        "InternalServerError", "DeadlineExceeded", "BadGateway", "GatewayTimeout",
+    }
+
+
+class RateLimiter:
+    """Token bucket for requests- and tokens-per-minute, shared by every process on the host.
+
+    Bucket levels and any 429 backoff live in a small JSON state file guarded
+    by an flock, so the miner and validator (or several miner workers) draw
+    from one quota. On top of that, each process adapts its own concurrency:
+    it grows slowly while calls succeed quickly and halves on throttling.
+    """
+
+    def __init__(self, rpm: int = None, tpm: int = None, state_path: str = None,
+                 max_concurrency: int = None, min_concurrency: int = 1):
+        self.rpm = rpm or int(os.getenv("GEMINI_RPM", 60))
+        self.tpm = tpm or int(os.getenv("GEMINI_TPM", 1000000))
+        self.state_path = state_path or os.path.join(cache_dir(), "gemini_rate_state.json")
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+
+        self.max_concurrency = max_concurrency or int(os.getenv("GEMINI_MAX_CONCURRENCY", 8))
+        self.min_concurrency = min_concurrency
+        self.concurrency = min(self.max_concurrency, max(self.min_concurrency, 2))
+        self._inflight = 0
+        self._successes = 0
+        self._latency = None
+        self._baseline_latency = None
+        self._cond = threading.Condition()
+
+        self._retrying = Retrying(
+            retry=retry_if_exception(is_retryable),
+            wait=wait_exponential(multiplier=2, max=60) + wait_random(0, 1),
+            stop=stop_after_attempt(int(os.getenv("GEMINI_MAX_RETRIES", 6))),
+            before_sleep=lambda state: print(
+                f"   ⏳ Gemini throttled ({state.outcome.exception()}); retry {state.attempt_number}..."
+            ),
+            reraise=True,
+        )
+
+    # --- shared token bucket ---
+
+    @contextmanager
+    def _shared_state(self):
+        with open(self.state_path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                state = json.loads(raw) if raw.strip() else {}
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refill(self, state: dict, now: float):
+        elapsed = max(0.0, now - state.get("updated_at", now))
+        state["requests"] = min(self.rpm, state.get("requests", self.rpm) + elapsed * self.rpm / 60)
+        state["tokens"] = min(self.tpm, state.get("tokens", self.tpm) + elapsed * self.tpm / 60)
+        state["updated_at"] = now
+
+    def _take(self, estimated_tokens: int):
+        """Block until one request and estimated_tokens are available, then spend them"""
+        estimated_tokens = min(estimated_tokens, self.tpm)
+        while True:
+            with self._shared_state() as state:
+                now = time.time()
+                self._refill(state, now)
+                wait = state.get("backoff_until", 0) - now
+                if wait <= 0:
+                    if state["requests"] >= 1 and state["tokens"] >= estimated_tokens:
+                        state["requests"] -= 1
+                        state["tokens"] -= estimated_tokens
+                        return
+                    wait = max(
+                        (1 - state["requests"]) * 60 / self.rpm,
+                        (estimated_tokens - state["tokens"]) * 60 / self.tpm,
+                    )
+            time.sleep(max(wait, 0.05))
+
+    def adjust_tokens(self, delta: int):
+        """Correct the token bucket once the real usage of a call is known"""
+        if delta:
+            with self._shared_state() as state:
+                self._refill(state, time.time())
+                state["tokens"] = min(self.tpm, state["tokens"] - delta)
+
+    def _backoff_all(self, seconds: float):
+        """Pause every process sharing the state file, not just this one"""
+        with self._shared_state() as state:
+            state["backoff_until"] = max(state.get("backoff_until", 0), time.time() + seconds)
+
+    # --- adaptive concurrency ---
+
+    @contextmanager
+    def _slot(self):
+        with self._cond:
+            while self._inflight >= self.concurrency:
+                self._cond.wait()
+            self._inflight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._inflight -= 1
+                self._cond.notify_all()
+
+    def _on_success(self, latency: float):
+        with self._cond:
+            self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+            # Baseline follows the fastest recent calls but drifts up slowly so one outlier can't pin it
+            if self._baseline_latency is None or latency < self._baseline_latency:
+                self._baseline_latency = latency
+            else:
+                self._baseline_latency = 0.98 * self._baseline_latency + 0.02 * latency
+            self._successes += 1
+            if self._latency > 2 * self._baseline_latency:
+                # Responses slowing down is the API queueing us; ease off before it throttles
+                self.concurrency = max(self.min_concurrency, self.concurrency - 1)
+                self._successes = 0
+            elif self._successes >= self.concurrency * 2 and self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+                self._successes = 0
+            self._cond.notify_all()
+
+    def _on_throttle(self):
+        with self._cond:
+            self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+            self._successes = 0
+
+    # --- public API ---
+
+    def call(self, fn: Callable[[], T], estimated_tokens: int = 0) -> T:
+        """Run fn under the shared quota, retrying 429 / 5xx with jittered exponential backoff"""
+        def attempt() -> T:
+            self._take(estimated_tokens)
+            with self._slot():
+                started = time.monotonic()
+                try:
+                    result = fn()
+                except Exception as e:
+                    if is_retryable(e):
+                        self._on_throttle()
+                        if getattr(e, "code", None) == 429:
+                            self._backoff_all(float(os.getenv("GEMINI_429_PAUSE_SECONDS", 5)))
+                    raise
+                self._on_success(time.monotonic() - started)
+                return result
+
+        return self._retrying.copy()(attempt)
+
+
+_shared_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide limiter, so every Gemini caller in a process shares one concurrency window"""
+    global _shared_limiter
+    if _shared_limiter is None:
+        _shared_limiter = RateLimiter()
+    return _shared_limiter
@@ -0,0 +1,165 @@
+import json
+import re
+from typing import Dict, List, Optional
+
+from lxml import etree, html as lxml_html
+
+ISO_DURATION = re.compile(r"^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$", re.IGNORECASE)
+
+
+def parse_duration_minutes(value) -> Optional[int]:
+    """Convert an ISO 8601 duration such as 'PT1H30M' to minutes"""
+    if not isinstance(value, str):
+        return None
+    match = ISO_DURATION.match(value.strip())
+    if not match or not any(match.groups()):
+        return None
+    days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return days * 1440 + hours * 60 + minutes + round(seconds / 60)
+
+
+def _clean(text) -> str:
+    return " ".join(str(text).split())
+
+
+def _is_recipe_type(node: Dict) -> bool:
+    node_type = node.get("@type")
+    types = node_type if isinstance(node_type, list) else [node_type]
+    return any(isinstance(t, str) and t.split("/")[-1] == "Recipe" for t in types)
+
+
+def _find_recipe_node(data) -> Optional[Dict]:
+    """Depth-first search for a schema.org Recipe object, handling @graph and lists"""
+    if isinstance(data, list):
+        for item in data:
+            found = _find_recipe_node(item)
+            if found:
+                return found
+    elif isinstance(data, dict):
+        if _is_recipe_type(data):
+            return data
+        for key in ("@graph", "mainEntity", "mainEntityOfPage"):
+            if key in data:
+                found = _find_recipe_node(data[key])
+                if found:
+                    return found
+    return None
+
+
+def _flatten_instructions(value) -> List[str]:
+    """Turn recipeInstructions (string, HowToStep, HowToSection or lists of them) into step texts"""
+    if isinstance(value, str):
+        # Some sites put every step in one string separated by newlines
+        return [_clean(line) for line in re.split(r"\n+", value) if line.strip()]
+    if isinstance(value, list):
+        steps = []
+        for item in value:
+            steps.extend(_flatten_instructions(item))
+        return steps
+    if isinstance(value, dict):
+        if "itemListElement" in value:
+            return _flatten_instructions(value["itemListElement"])
+        text = value.get("text") or value.get("name")
+        return [_clean(text)] if text else []
+    return []
+
+
+def _yield_servings(value) -> Optional[int]:
+    values = value if isinstance(value, list) else [value]
+    for item in values:
+        match = re.search(r"\d+", str(item))
+        if match:
+            return int(match.group())
+    return None
+
+
+def _normalize(name, ingredients, steps, prep, cook, total, servings) -> Optional[Dict]:
+    ingredients = [_clean(item) for item in ingredients if str(item).strip()]
+    if not ingredients and not steps:
+        return None
+    recipe = {
+        "name": _clean(name) if name else None,
+        "ingredients": ingredients,
+        "steps": steps,
+        "prep_time_minutes": parse_duration_minutes(prep),
+        "cook_time_minutes": parse_duration_minutes(cook),
+        "total_time_minutes": parse_duration_minutes(total),
+        "servings": _yield_servings(servings),
+    }
+    # Missing fields would only cost prompt tokens
+    return {key: value for key, value in recipe.items() if value is not None}
+
+
+def _from_json_ld(tree) -> Optional[Dict]:
+    for script in tree.xpath('//script[@type="application/ld+json"]'):
+        try:
+            data = json.loads(script.text_content(), strict=False)
+        except ValueError:
+            continue
+        node = _find_recipe_node(data)
+        if not node:
+            continue
+        ingredients = node.get("recipeIngredient") or node.get("ingredients") or []
+        if isinstance(ingredients, str):
+            ingredients = [ingredients]
+        recipe = _normalize(
+            node.get("name"),
+            ingredients,
+            _flatten_instructions(node.get("recipeInstructions")),
+            node.get("prepTime"),
+            node.get("cookTime"),
+            node.get("totalTime"),
+            node.get("recipeYield"),
+        )
+        if recipe:
+            return recipe
+    return None
+
+
+def _itemprop_value(scope, prop: str) -> Optional[str]:
+    nodes = scope.xpath(f'.//*[@itemprop="{prop}"]')
+    if not nodes:
+        return None
+    node = nodes[0]
+    return node.get("content") or node.get("datetime") or node.text_content()
+
+
+def _from_microdata(tree) -> Optional[Dict]:
+    for scope in tree.xpath('//*[@itemscope][contains(@itemtype, "schema.org/Recipe")]'):
+        ingredients = [
+            node.get("content") or node.text_content()
+            for node in scope.xpath('.//*[@itemprop="recipeIngredient" or @itemprop="ingredients"]')
+        ]
+        steps = []
+        for node in scope.xpath('.//*[@itemprop="recipeInstructions"]'):
+            # Nested HowToStep items carry their text in itemprop="text"
+            texts = node.xpath('.//*[@itemprop="text"]')
+            if texts:
+                steps.extend(_clean(text.text_content()) for text in texts)
+            else:
+                steps.extend(_flatten_instructions(node.text_content()))
+        recipe = _normalize(
+            _itemprop_value(scope, "name"),
+            ingredients,
+            [step for step in steps if step],
+            _itemprop_value(scope, "prepTime"),
+            _itemprop_value(scope, "cookTime"),
+            _itemprop_value(scope, "totalTime"),
+            _itemprop_value(scope, "recipeYield"),
+        )
+        if recipe:
+            return recipe
+    return None
+
+
+def extract_structured_recipe(html: str) -> Optional[Dict]:
+    """Pull a schema.org Recipe out of a page's JSON-LD or microdata.
+
+    Returns a compact dict with name, ingredients, steps, times in minutes and
+    servings (fields the page omits are left out), or None when the page has no usable structured recipe.
+    """
+    try:
+        tree = lxml_html.fromstring(html)
+    except (ValueError, etree.ParserError):
+        return None
+    return _from_json_ld(tree) or _from_microdata(tree)
@@ -0,0 +1,164 @@
+import json
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from cache import cache_dir
+
+UNIT_COLUMNS = "id, name, plural_name, abbreviation, common_name, alternative_names, display_order"
+CUSTOM_UNIT_COLUMNS = "id, name, plural_name, abbreviation, base_unit_id, conversion_to_base, display_order"
+
+# Bump when the snapshot layout changes, so older snapshots are fetched again
+SNAPSHOT_VERSION = 2
+
+# Spellings recipes use that the units table may not list, mapped to one it does
+ALIASES = {
+    "tbs": "tbsp", "tbl": "tbsp", "tbls": "tbsp", "tblsp": "tbsp", "tblspn": "tbsp",
+    "tspn": "tsp",
+    "c": "cup",
+    "gr": "g", "gm": "g",
+    "ltr": "l", "lt": "l",
+    "fl oz": "fluid ounce",
+    "pc": "piece", "pcs": "piece", "ea": "piece", "each": "piece", "whole": "piece",
+}
+
+# Abbreviations where case carries the meaning
+CASE_SENSITIVE = {"T": "tablespoon", "t": "teaspoon"}
+
+
+def normalize(unit: str) -> str:
+    """Lowercase, drop periods and collapse whitespace: " Fl. Oz. " -> "fl oz" """
+    return re.sub(r"\s+", " ", (unit or "").replace(".", " ").lower()).strip()
+
+
+class UnitResolver:
+    """Resolves unit strings to `units` IDs from an in-memory index.
+
+    The whole `units` table, plus the space's `custom_units`, is loaded once
+    (from a local snapshot when a fresh one exists) and indexed by name,
+    plural, abbreviation and alternative names, so resolving a unit never
+    touches the network. Custom units resolve to their base unit because
+    ingredients reference `units`, together with their `conversion_to_base`
+    factor, so "2 sticks" can be stored as the matching amount of the base
+    unit.
+    """
+
+    def __init__(self, client, space_id: str = None, snapshot_path: str = None, ttl_seconds: int = None):
+        self.db = client
+        self.space_id = space_id
+        self.snapshot_path = snapshot_path or os.path.join(
+            cache_dir(), f"units_{space_id or 'global'}.json"
+        )
+        self.ttl_seconds = ttl_seconds or int(float(os.getenv("UNITS_SNAPSHOT_TTL_HOURS", 24)) * 3600)
+        self._index: Optional[Dict[str, Tuple[str, float]]] = None
+        self._exact: Dict[str, Tuple[str, float]] = {}
+
+    def _fetch_all(self, table: str, columns: str, **filters) -> List[Dict]:
+        """Every row of a table, paging past the API's row limit"""
+        rows, page = [], 1000
+        while True:
+            query = self.db.table(table).select(columns)
+            for column, value in filters.items():
+                query = query.eq(column, value)
+            batch = query.range(len(rows), len(rows) + page - 1).execute().data or []
+            rows.extend(batch)
+            if len(batch) < page:
+                return rows
+
+    def _read_snapshot(self) -> Optional[Dict]:
+        try:
+            with open(self.snapshot_path, "r") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return None
+        if time.time() - snapshot.get("fetched_at", 0) >= self.ttl_seconds:
+            return None
+        return snapshot
+
+    def _write_snapshot(self, snapshot: Dict):
+        os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def load(self, refresh: bool = False):
+        """Build the index from the snapshot, or from the database when it is stale or refresh is set"""
+        snapshot = None if refresh else self._read_snapshot()
+        source = "snapshot"
+        if snapshot is None:
+            snapshot = {
+                "version": SNAPSHOT_VERSION,
+                "fetched_at": time.time(),
+                "units": self._fetch_all("units", UNIT_COLUMNS),
+                "custom_units": (
+                    self._fetch_all("custom_units", CUSTOM_UNIT_COLUMNS, space_id=self.space_id)
+                    if self.space_id else []
+                ),
+            }
+            self._write_snapshot(snapshot)
+            source = "database"
+        self._build(snapshot["units"], snapshot["custom_units"])
+        print(f"📏 Loaded {len(snapshot['units'])} units and {len(snapshot['custom_units'])} custom units "
+              f"from {source}")
+
+    def _build(self, units: List[Dict], custom_units: List[Dict]):
+        index: Dict[str, Tuple[str, float]] = {}
+        exact: Dict[str, Tuple[str, float]] = {}
+        units = sorted(units, key=lambda u: u.get("display_order") or 0)
+        custom_units = sorted(custom_units, key=lambda u: u.get("display_order") or 0)
+
+        # Shared units are used as-is; a custom unit is its base unit scaled by conversion_to_base
+        groups = (
+            [(unit, (unit["id"], 1.0)) for unit in units],
+            [(unit, (unit["base_unit_id"], float(unit["conversion_to_base"]))) for unit in custom_units],
+        )
+
+        # Earlier entries win: shared units before custom ones, names before abbreviations
+        for entries in groups:
+            for unit, target in entries:
+                names = [unit.get("name"), unit.get("plural_name"), unit.get("common_name")]
+                names += unit.get("alternative_names") or []
+                for name in names:
+                    if name:
+                        index.setdefault(normalize(name), target)
+            for unit, target in entries:
+                abbreviation = unit.get("abbreviation")
+                if abbreviation:
+                    exact.setdefault(abbreviation.strip(), target)
+                    index.setdefault(normalize(abbreviation), target)
+
+        self._index, self._exact = index, exact
+
+    def reset(self):
+        """Drop the index; the next lookup loads it again"""
+        self._index = None
+        self._exact = {}
+
+    def _lookup(self, key: str) -> Optional[Tuple[str, float]]:
+        # "cups" -> "cup", "pinches" -> "pinch", "lbs." -> "lb"
+        candidates = [key]
+        if key.endswith("es"):
+            candidates.append(key[:-2])
+        if key.endswith("s"):
+            candidates.append(key[:-1])
+        for candidate in candidates:
+            if candidate in self._index:
+                return self._index[candidate]
+            if candidate in ALIASES and ALIASES[candidate] in self._index:
+                return self._index[ALIASES[candidate]]
+        return None
+
+    def resolve(self, unit_name: str) -> Optional[Tuple[str, float]]:
+        """(unit ID, factor to multiply amounts by) for a unit string, or None if nothing matches"""
+        if self._index is None:
+            self.load()
+        raw = (unit_name or "").strip()
+        if raw in CASE_SENSITIVE:
+            return self._lookup(normalize(CASE_SENSITIVE[raw]))
+        if raw in self._exact:
+            return self._exact[raw]
+        return self._lookup(normalize(raw))
@@ -1,11 +1,16 @@
+import argparse
 import json
 import os
 import sys
 import uuid
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+import httpx
 import supabase
 
+from ledger import UploadLedger, recipe_hash
+
 # Load environment variables
 load_dotenv()
 
@@ -23,93 +28,236 @@ if "aajeyifqrupykjyapoft" not in SUPABASE_URL:
         "Expected to contain: aajeyifqrupykjyapoft"
     )
 
-# Initialize Supabase client
-supabase_client = supabase.create_client(SUPABASE_URL, SUPABASE_KEY)
+UPLOADER_WORKERS = int(os.getenv('UPLOADER_WORKERS', 4))
+
+# (recipe ID, whether this upload inserted it); False means the space already had the recipe
+Uploaded = Tuple[str, bool]
+
+def create_pooled_client(pool_size: int) -> supabase.Client:
+    """Supabase client whose PostgREST calls share one keep-alive connection pool across threads"""
+    http_client = httpx.Client(
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        timeout=httpx.Timeout(float(os.getenv('UPLOADER_TIMEOUT', 120)), connect=10.0),
+    )
+    try:
+        options = supabase.ClientOptions(httpx_client=http_client)
+    except TypeError:
+        # Older supabase-py has no httpx_client option; its own pool is still shared by all threads
+        http_client.close()
+        options = supabase.ClientOptions()
+    client = supabase.create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+    # Build the lazily created PostgREST client now rather than racing to create it from worker threads
+    client.postgrest
+    return client
 
 class RecipeUploader:
-    """Uploads validated recipes to staging space using direct table inserts"""
+    """Uploads validated recipes to the staging space"""
     
-    def __init__(self):
+    def __init__(self, use_rpc: bool = None, chunk_size: int = None, workers: int = None,
+                 reupload: bool = False):
         self.input_dir = "validated_recipes"
+        # Both paths need the 20251217 migrations (content_hash column); only the RPCs need the functions
+        if use_rpc is None:
+            use_rpc = os.getenv("UPLOADER_USE_RPC", "true").lower() in ("1", "true", "yes")
+        self.use_rpc = use_rpc
+        # Recipes per create_recipes_bulk call; 1 uploads each recipe on its own
+        self.chunk_size = chunk_size or int(os.getenv("UPLOADER_CHUNK_SIZE", 100))
+        # Requests in flight at once; each chunk fails or succeeds independently
+        self.workers = workers or UPLOADER_WORKERS
+        # One pooled client per uploader, with a connection for every worker
+        self.client = create_pooled_client(self.workers)
+        # Recipes earlier runs uploaded; reupload ignores it and lets the database skip duplicates
+        self.ledger = UploadLedger(STAGING_SPACE_ID)
+        self.reupload = reupload
     
     def upload_recipe(self, recipe_data: Dict, qa_data: Dict, batch_id: str) -> Optional[str]:
-        """Upload a single recipe using the exact pattern from recipeService.ts"""
-        title = recipe_data.get('title', 'Unknown Recipe')
-        
+        """Upload a single recipe, in one transactional RPC call unless direct inserts are configured"""
+        uploaded = self._upload_one(recipe_data, qa_data, batch_id)
+        return uploaded[0] if uploaded else None
+    
+    def _upload_one(self, recipe_data: Dict, qa_data: Dict, batch_id: str) -> Optional[Uploaded]:
+        """(recipe ID, inserted) for a single recipe, or None if the upload failed"""
         try:
-            # Step 1: Create the recipe (exact pattern from recipeService.ts)
-            recipe_payload = {
-                "title": recipe_data['title'],
-                "description": recipe_data.get('description', ''),
-                "image_url": None,
-                "prep_time_minutes": int(recipe_data['prep_time_minutes']),
-                "cook_time_minutes": int(recipe_data['cook_time_minutes']),
-                "servings": int(recipe_data['servings']),
-                "difficulty": recipe_data['difficulty'],
-                "is_public": False,
-                "privacy_level": "space",
-                "space_id": STAGING_SPACE_ID,
-                "user_id": TARGET_USER_ID,
-                "calories_per_serving": None,
+            if self.use_rpc:
+                return self._upload_via_rpc(recipe_data, qa_data, batch_id)
+            return self._upload_via_tables(recipe_data, qa_data, batch_id)
+        except Exception as e:
+            print(f"      ❌ Upload failed: {e}")
+            return None
+    
+    def _recipe_payload(self, recipe_data: Dict, qa_data: Dict) -> Dict:
+        """Recipe row in the exact shape recipeService.ts creates"""
+        recipe_payload = {
+            "title": recipe_data['title'],
+            "description": recipe_data.get('description', ''),
+            "image_url": None,
+            "prep_time_minutes": int(recipe_data['prep_time_minutes']),
+            "cook_time_minutes": int(recipe_data['cook_time_minutes']),
+            "servings": int(recipe_data['servings']),
+            "difficulty": recipe_data['difficulty'],
+            "is_public": False,
+            "privacy_level": "space",
+            "space_id": STAGING_SPACE_ID,
+            "user_id": TARGET_USER_ID,
+            "calories_per_serving": None,
+        }
+        
+        # Add QA flag to description if needed
+        if qa_data['status'] == 'FLAG':
+            recipe_payload['description'] = f"⚠️ QA Flagged: {qa_data['reason']}\n\n{recipe_payload['description']}"
+        
+        return recipe_payload
+    
+    @staticmethod
+    def _ingredient_rows(recipe_data: Dict) -> List[Dict]:
+        return [
+            {
+                "food_id": None,  # Using text fields instead
+                "unit_id": None,
+                "food_name": ing['item'],
+                "unit_name": ing['unit'],
+                "amount": float(ing['amount']),
+                "order_index": idx,
             }
-            
-            # Add QA flag to description if needed
-            if qa_data['status'] == 'FLAG':
-                recipe_payload['description'] = f"⚠️ QA Flagged: {qa_data['reason']}\n\n{recipe_payload['description']}"
-            
-            result = supabase_client.table('recipes').insert(recipe_payload).execute()
-            
-            if not result.data or len(result.data) == 0:
-                raise Exception("Failed to create recipe")
-            
-            recipe_id = result.data[0]['id']
-            
-            # Step 2: Create ingredients (exact pattern from recipeService.ts)
-            if recipe_data.get('ingredients'):
-                ingredients = []
-                for ing in recipe_data['ingredients']:
-                    ingredients.append({
-                        "recipe_id": recipe_id,
-                        "food_id": None,  # Using text fields instead
-                        "unit_id": None,
-                        "food_name": ing['item'],
-                        "unit_name": ing['unit'],
-                        "amount": float(ing['amount']),
-                    })
-                
-                ing_result = supabase_client.table('ingredients').insert(ingredients).execute()
-                if hasattr(ing_result, 'error') and ing_result.error:
-                    # Rollback recipe if ingredients fail
-                    supabase_client.table('recipes').delete().eq('id', recipe_id).execute()
-                    raise Exception(f"Failed to insert ingredients: {ing_result.error}")
-                
+            for idx, ing in enumerate(recipe_data.get('ingredients') or [])
+        ]
+    
+    @staticmethod
+    def _step_rows(recipe_data: Dict) -> List[Dict]:
+        return [
+            {
+                "order_number": int(step['order']),
+                "instruction": step['instruction'],
+                "duration_minutes": int(step.get('duration_minutes', 0)),
+            }
+            for step in recipe_data.get('steps') or []
+        ]
+    
+    def _rpc_item(self, recipe_data: Dict, qa_data: Dict, batch_id: str) -> Dict:
+        """One recipe in the {recipe, ingredients, steps} shape the upload RPCs take"""
+        recipe_payload = self._recipe_payload(recipe_data, qa_data)
+        recipe_payload.update({
+            "tags": recipe_data.get('tags') or [],
+            "batch_id": batch_id,
+            "qa_status": qa_data.get('status', 'pending').lower(),
+            "content_hash": recipe_hash(recipe_data),
+        })
+        return {
+            "recipe": recipe_payload,
+            "ingredients": self._ingredient_rows(recipe_data),
+            "steps": self._step_rows(recipe_data),
+        }
+    
+    def _call_bulk_rpc(self, items: List[Dict]) -> List[Uploaded]:
+        """Run create_recipes_bulk; one (recipe ID, inserted) pair per item, in input order"""
+        result = self.client.rpc('create_recipes_bulk', {"recipes_data": items}).execute()
+        rows = sorted(result.data or [], key=lambda row: row['ord'])
+        if len(rows) != len(items):
+            raise Exception(f"Expected {len(items)} recipe IDs, got {len(rows)}")
+        return [(row['recipe_id'], bool(row['inserted'])) for row in rows]
+    
+    def _upload_via_rpc(self, recipe_data: Dict, qa_data: Dict, batch_id: str) -> Uploaded:
+        """Recipe, ingredients and steps in one round trip; the database rolls back on any error"""
+        item = self._rpc_item(recipe_data, qa_data, batch_id)
+        
+        # A one-recipe bulk call, which unlike create_recipe_with_ingredients says whether it inserted
+        recipe_id, inserted = self._call_bulk_rpc([item])[0]
+        
+        if inserted:
+            print(f"      ✅ Inserted recipe with {len(item['ingredients'])} ingredients and {len(item['steps'])} steps")
+        else:
+            print(f"      ↩️  Already uploaded as {recipe_id}")
+        return recipe_id, inserted
+    
+    def upload_recipes_bulk(self, entries: List[Tuple[Dict, Dict]], batch_id: str) -> List[Optional[Uploaded]]:
+        """Upload (recipe, qa_meta) pairs with one create_recipes_bulk call; results come back in order
+        
+        The call is one transaction, so if any recipe is rejected the whole
+        chunk rolls back. It is then retried one recipe at a time so only the
+        bad recipes fail. Recipes whose content hash the space already has are not
+        inserted again; their existing ID is returned with inserted set to False.
+        """
+        ids: List[Optional[Uploaded]] = [None] * len(entries)
+        items, positions = [], []
+        for idx, (recipe_data, qa_data) in enumerate(entries):
+            try:
+                items.append(self._rpc_item(recipe_data, qa_data, batch_id))
+                positions.append(idx)
+            except Exception as e:
+                print(f"      ❌ Invalid recipe '{recipe_data.get('title', 'Unknown')}': {e}")
+        
+        if not items:
+            return ids
+        
+        try:
+            results = self._call_bulk_rpc(items)
+            for idx, uploaded in zip(positions, results):
+                ids[idx] = uploaded
+            inserted = sum(1 for _, was_inserted in results if was_inserted)
+            print(f"      ✅ Inserted {inserted} of {len(items)} recipes in one call")
+        except Exception as e:
+            print(f"      ⚠️ Bulk upload of {len(items)} recipes failed ({e}); retrying one by one")
+            for idx in positions:
+                ids[idx] = self._upload_one(*entries[idx], batch_id)
+        return ids
+    
+    def _upload_via_tables(self, recipe_data: Dict, qa_data: Dict, batch_id: str) -> Uploaded:
+        """Upload using the exact pattern from recipeService.ts: three inserts with manual rollback"""
+        content_hash = recipe_hash(recipe_data)
+        existing = (
+            self.client.table('recipes').select('id')
+            .eq('space_id', STAGING_SPACE_ID).eq('content_hash', content_hash)
+            .limit(1).execute()
+        )
+        if existing.data:
+            print(f"      ↩️  Already uploaded as {existing.data[0]['id']}")
+            return existing.data[0]['id'], False
+        
+        # Step 1: Create the recipe; the unique (space_id, content_hash) index rejects a concurrent duplicate
+        recipe_payload = self._recipe_payload(recipe_data, qa_data)
+        recipe_payload.update({"batch_id": batch_id, "content_hash": content_hash})
+        result = self.client.table('recipes').insert(recipe_payload).execute()
+        
+        if not result.data or len(result.data) == 0:
+            raise Exception("Failed to create recipe")
+        
+        recipe_id = result.data[0]['id']
+        
+        # Steps 2-3: execute() raises on failure, so any error rolls the recipe back before re-raising;
+        # a leftover recipe row would carry the content hash and look uploaded on every rerun
+        try:
+            # Step 2: Create ingredients
+            ingredients = [dict(row, recipe_id=recipe_id) for row in self._ingredient_rows(recipe_data)]
+            if ingredients:
+                self.client.table('ingredients').insert(ingredients).execute()
                 print(f"      ✅ Inserted {len(ingredients)} ingredients")
             
             # Step 3: Create steps (using 'steps' table, not recipe_version_steps)
-            if recipe_data.get('steps'):
-                steps = []
-                for step in recipe_data['steps']:
-                    steps.append({
-                        "recipe_id": recipe_id,
-                        "order_number": int(step['order']),
-                        "instruction": step['instruction'],
-                        "duration_minutes": int(step.get('duration_minutes', 0)),
-                    })
-                
-                steps_result = supabase_client.table('steps').insert(steps).execute()
-                if hasattr(steps_result, 'error') and steps_result.error:
-                    # Rollback if steps fail
-                    supabase_client.table('ingredients').delete().eq('recipe_id', recipe_id).execute()
-                    supabase_client.table('recipes').delete().eq('id', recipe_id).execute()
-                    raise Exception(f"Failed to insert steps: {steps_result.error}")
-                
+            steps = [dict(row, recipe_id=recipe_id) for row in self._step_rows(recipe_data)]
+            if steps:
+                self.client.table('steps').insert(steps).execute()
                 print(f"      ✅ Inserted {len(steps)} steps")
-            
-            return recipe_id
-            
+        except Exception:
+            self._rollback_recipe(recipe_id)
+            raise
+        
+        return recipe_id, True
+    
+    def _rollback_recipe(self, recipe_id: str):
+        """Delete a partly uploaded recipe and its ingredients"""
+        try:
+            self.client.table('ingredients').delete().eq('recipe_id', recipe_id).execute()
+            self.client.table('recipes').delete().eq('id', recipe_id).execute()
+            print(f"      ↪️  Rolled back recipe {recipe_id}")
         except Exception as e:
-            print(f"      ❌ Upload failed: {e}")
-            return None
+            print(f"      ⚠️ Rollback of recipe {recipe_id} failed: {e}")
+    
+    def _upload_chunk(self, chunk: List[Tuple[int, Dict, Dict]], batch_id: str) -> List[Optional[Uploaded]]:
+        """Upload one chunk of (index, recipe, qa_meta) entries; results follow the chunk order"""
+        if len(chunk) > 1:
+            return self.upload_recipes_bulk([(recipe, qa_meta) for _, recipe, qa_meta in chunk], batch_id)
+        _, recipe, qa_meta = chunk[0]
+        return [self._upload_one(recipe, qa_meta, batch_id)]
     
     def upload_batch(self, input_file: str) -> bool:
         """Upload all recipes in a validated batch file"""
@@ -121,12 +269,17 @@ class RecipeUploader:
         
         # Generate batch ID for tracking
         batch_id = str(uuid.uuid4())
-        stats = {"success": 0, "failed": 0, "skipped": 0}
+        stats = {"success": 0, "failed": 0, "skipped": 0, "existing": 0}
         
-        print(f"\n📊 Uploading {len(items)} recipes to staging space")
+        print(f"\n📊 Uploading {len(items)} recipes to staging space ({self.workers} workers)")
         print(f"   Batch ID: {batch_id}\n")
         
-        # Upload each recipe
+        # Content hashes identify recipes across runs, so a rerun only sends what is missing
+        hashes = {idx: recipe_hash(item['recipe']) for idx, item in enumerate(items) if item.get('recipe')}
+        uploaded = {} if self.reupload else self.ledger.get_many(list(set(hashes.values())))
+        
+        # Collect uploadable recipes, keeping their position in the file
+        pending = []
         for idx, item in enumerate(items):
             recipe = item.get('recipe')
             qa_meta = item.get('qa_meta', {})
@@ -135,27 +288,62 @@ class RecipeUploader:
                 print(f"  ⚠️  Item {idx+1}: No recipe data - skipping")
                 stats["skipped"] += 1
                 continue
-            
-            # Upload recipe
-            recipe_id = self.upload_recipe(recipe, qa_meta, batch_id)
-            
-            if recipe_id:
-                print(f"  ✅ {idx+1}/{len(items)}: {recipe['title'][:50]}...")
-                stats["success"] += 1
-            else:
-                print(f"  ❌ {idx+1}/{len(items)}: {recipe.get('title', 'Unknown')[:50]}...")
-                stats["failed"] += 1
+            if hashes[idx] in uploaded:
+                print(f"  ↩️  {idx+1}/{len(items)}: {recipe.get('title', 'Unknown')[:50]}... already uploaded")
+                stats["existing"] += 1
+                continue
+            # A repeat within the file is the same recipe; send it once
+            uploaded[hashes[idx]] = None
+            pending.append((idx, recipe, qa_meta))
+        
+        # Bulk mode sends chunk_size recipes per request; otherwise one recipe per request
+        chunk_size = self.chunk_size if self.use_rpc else 1
+        chunks = [pending[start:start + chunk_size] for start in range(0, len(pending), chunk_size)]
+        
+        # Workers only upload; results are tallied here so the stats stay exact
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            futures = {pool.submit(self._upload_chunk, chunk, batch_id): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    print(f"  ❌ Upload worker error: {e}")
+                    results = [None] * len(chunk)
+                
+                for (idx, recipe, _), uploaded in zip(chunk, results):
+                    if uploaded:
+                        recipe_id, inserted = uploaded
+                        if inserted:
+                            print(f"  ✅ {idx+1}/{len(items)}: {recipe['title'][:50]}...")
+                            stats["success"] += 1
+                        else:
+                            # Stored by an earlier run, or by a timed-out call that had committed
+                            print(f"  ↩️  {idx+1}/{len(items)}: {recipe['title'][:50]}... already uploaded")
+                            stats["existing"] += 1
+                        self.ledger.put(hashes[idx], recipe_id, batch_id)
+                    else:
+                        print(f"  ❌ {idx+1}/{len(items)}: {recipe.get('title', 'Unknown')[:50]}...")
+                        stats["failed"] += 1
         
         # Summary
         print(f"\n📈 Upload Complete:")
         print(f"   ✅ Success: {stats['success']}")
         print(f"   ❌ Failed: {stats['failed']}")
+        print(f"   ↩️  Already uploaded: {stats['existing']}")
         print(f"   ⚠️  Skipped: {stats['skipped']}")
         
         return stats["failed"] == 0
 
 if __name__ == "__main__":
-    uploader = RecipeUploader()
+    parser = argparse.ArgumentParser(description="Upload validated recipes to the staging space")
+    parser.add_argument("--workers", type=int, help="Upload requests in flight at once")
+    parser.add_argument("--chunk-size", type=int, help="Recipes per bulk upload call (1 = one call per recipe)")
+    parser.add_argument("--reupload", action="store_true",
+                        help="Ignore the local upload ledger; the database still skips recipes it already has")
+    args = parser.parse_args()
+    
+    uploader = RecipeUploader(chunk_size=args.chunk_size, workers=args.workers, reupload=args.reupload)
     
     # Find all batch files
     batch_files = [
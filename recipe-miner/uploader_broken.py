@@ -41,7 +41,7 @@ class RecipeUploader:
     """Uploads validated recipes to staging space using atomic transactions"""
     
     def __init__(self):
-        self.db = DatabaseManager(supabase)
+        self.db = DatabaseManager(supabase, STAGING_SPACE_ID)
         self.input_dir = "validated_recipes"
     
     def prepare_ingredients(self, ingredients: List[Dict], space_id: str, user_id: str) -> List[Dict]:
@@ -1,44 +1,47 @@
 import os
 from supabase import create_client
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Optional, Tuple
+
+from units import UnitResolver
 
 load_dotenv()
 
 class DatabaseManager:
     """Shared database utilities for recipe mining pipeline"""
     
-    def __init__(self, client):
+    def __init__(self, client, space_id: str):
         self.db = client
         self.unit_cache = {}
         self.food_cache = {}
+        # All units and the space's custom units are loaded once and resolved locally
+        self.units = UnitResolver(client, space_id)
     
-    def get_or_create_unit(self, unit_name: str) -> Optional[str]:
-        """Find unit ID with caching and fallback"""
-        if unit_name in self.unit_cache:
-            return self.unit_cache[unit_name]
+    def get_or_create_unit(self, unit_name: str, amount: float) -> Optional[Tuple[str, float]]:
+        """Find unit ID in the preloaded unit index, falling back to 'piece'
         
-        # Try exact match first
-        res = self.db.table("units").select("id").ilike("name", unit_name).execute()
-        if res.data:
-            uid = res.data[0]['id']
-            self.unit_cache[unit_name] = uid
-            return uid
+        Returns the unit ID with the amount expressed in that unit: a custom
+        unit resolves to its base unit, so its amount is scaled by the
+        custom unit's conversion_to_base.
+        """
+        if unit_name in self.unit_cache:
+            uid, factor = self.unit_cache[unit_name]
+            return uid, amount * factor
         
-        # Try abbreviation match
-        res = self.db.table("units").select("id").ilike("abbreviation", unit_name).execute()
-        if res.data:
-            uid = res.data[0]['id']
-            self.unit_cache[unit_name] = uid
-            return uid
+        # Name, plural or abbreviation match
+        match = self.units.resolve(unit_name)
+        if match:
+            self.unit_cache[unit_name] = match
+            uid, factor = match
+            return uid, amount * factor
         
-        # Fallback to 'piece' for unknown units
-        res = self.db.table("units").select("id").ilike("name", "piece").execute()
-        if res.data:
-            uid = res.data[0]['id']
-            self.unit_cache[unit_name] = uid
+        # Fallback to 'piece' for unknown units; the amount is kept as given
+        match = self.units.resolve("piece")
+        if match:
+            uid = match[0]
+            self.unit_cache[unit_name] = (uid, 1.0)
             print(f"   ⚠️ Using 'piece' as fallback for unit '{unit_name}'")
-            return uid
+            return uid, amount
         
         print(f"   ❌ Could not find unit: {unit_name}")
         return None
@@ -73,3 +76,4 @@ class DatabaseManager:
         """Clear all caches - useful for testing or large batches"""
         self.unit_cache.clear()
         self.food_cache.clear()
+        self.units.reset()
@@ -1,12 +1,23 @@
+import argparse
+import hashlib
 import json
 import os
 import glob
-import time
-from typing import Dict, List, Literal
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Literal, Optional, Tuple
 from pydantic import BaseModel, Field
 from datetime import datetime
 import google.generativeai as genai
 from dotenv import load_dotenv
+from cache import LLMCache
+from crossref import cross_reference
+from gemini import GeminiClient
+from ledger import ValidationLedger, recipe_hash
+from prescreen import (
+    MAX_SERVINGS, MAX_TOTAL_MINUTES, MIN_INGREDIENTS, MIN_SERVINGS, MIN_STEPS, REQUIRED_FIELDS, BatchPrescreen
+)
+from rate_limiter import get_rate_limiter
 
 # Load environment variables
 load_dotenv()
@@ -24,18 +35,61 @@ class ValidationResult(BaseModel):
     status: Literal["PASS", "FLAG"] = Field(description="Validation status")
     reason: str = Field(description="Explanation for the status. Use 'OK' for PASS status")
 
+VALIDATION_CRITERIA = """VALIDATION CRITERIA:
+        1. SAFETY: Any dangerous or non-food items? Any unsafe cooking practices?
+        2. LOGIC: Are steps in logical order?
+        3. COMPLETENESS: Are all necessary steps included? Are cooking times realistic?
+        4. CONSISTENCY: Do ingredient quantities match the number of servings?
+        5. AUTHENTICITY: For traditional dishes, are there any clearly inauthentic ingredients?"""
+
+# Bump when the local checks or prompt wording change, so earlier verdicts are re-judged
+RULES_VERSION = "3"
+
+VALIDATION_ERROR = "Validation error:"
+
+def validator_version(model_name: str) -> str:
+    """Identifies everything that shapes a verdict: model, criteria and local rules"""
+    fingerprint = f"{model_name}|{RULES_VERSION}|{VALIDATION_CRITERIA}"
+    return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:16]
+
 class RecipeValidator:
     """Validates recipes using LLM-as-a-Judge approach"""
     
-    def __init__(self):
+    def __init__(self, use_cache: bool = True, concurrency: int = None, batch_size: int = None,
+                 revalidate: bool = False):
         self.input_dir = "draft_recipes"
         self.output_dir = "validated_recipes"
         os.makedirs(self.output_dir, exist_ok=True)
+        
+        # Recipes judged at once; the shared rate limiter still caps Gemini traffic
+        self.concurrency = concurrency or int(os.getenv("VALIDATOR_CONCURRENCY", 4))
+        # Recipes per Gemini call; 1 keeps the classic one-call-per-recipe behaviour
+        self.batch_size = batch_size or int(os.getenv("VALIDATOR_BATCH_SIZE", 1))
+        self.llm = GeminiClient(model, LLMCache() if use_cache else None, get_rate_limiter())
+        self.prescreen = BatchPrescreen()
+        
+        # Verdicts from earlier runs; revalidate ignores them but still records new ones
+        self.ledger = ValidationLedger(validator_version(self.llm.model_name))
+        self.revalidate = revalidate
+    
+    @staticmethod
+    def _describe_recipe(recipe: Dict) -> str:
+        """The recipe as the judge sees it"""
+        return f"""Title: {recipe.get('title', 'Unknown Recipe')}
+        Description: {recipe.get('description', 'No description')}
+        Prep Time: {recipe.get('prep_time_minutes', 0)} minutes
+        Cook Time: {recipe.get('cook_time_minutes', 0)} minutes
+        Servings: {recipe.get('servings', 0)}
+        Difficulty: {recipe.get('difficulty', 'unknown')}
+        
+        INGREDIENTS ({len(recipe.get('ingredients', []))}):
+        {json.dumps(recipe.get('ingredients', []), indent=2)}
+        
+        STEPS ({len(recipe.get('steps', []))}):
+        {json.dumps(recipe.get('steps', []), indent=2)}"""
     
     def validate_recipe(self, recipe: Dict) -> ValidationResult:
         """Validate a single recipe using AI"""
-        title = recipe.get('title', 'Unknown Recipe')
-        
         # Quick sanity checks before AI validation
         quick_checks = self._quick_checks(recipe)
         if quick_checks:
@@ -49,25 +103,9 @@ class RecipeValidator:
         You are a Food Safety & Quality Assurance Officer. Review this recipe for critical issues.
         
         RECIPE TO VALIDATE:
-        Title: {title}
-        Description: {recipe.get('description', 'No description')}
-        Prep Time: {recipe.get('prep_time_minutes', 0)} minutes
-        Cook Time: {recipe.get('cook_time_minutes', 0)} minutes
-        Servings: {recipe.get('servings', 0)}
-        Difficulty: {recipe.get('difficulty', 'unknown')}
-        
-        INGREDIENTS ({len(recipe.get('ingredients', []))}):
-        {json.dumps(recipe.get('ingredients', []), indent=2)}
-        
-        STEPS ({len(recipe.get('steps', []))}):
-        {json.dumps(recipe.get('steps', []), indent=2)}
+        {self._describe_recipe(recipe)}
         
-        VALIDATION CRITERIA:
-        1. SAFETY: Any dangerous or non-food items? Any unsafe cooking practices?
-        2. LOGIC: Do steps reference ingredients that aren't listed? Are steps in logical order?
-        3. COMPLETENESS: Are all necessary steps included? Are cooking times realistic?
-        4. CONSISTENCY: Do ingredient quantities match the number of servings?
-        5. AUTHENTICITY: For traditional dishes, are there any clearly inauthentic ingredients?
+        {VALIDATION_CRITERIA}
         
         RESPOND WITH JSON ONLY:
         {{
@@ -77,46 +115,108 @@ class RecipeValidator:
         """
         
         try:
-            result = model.generate_content(
+            # Lower temperature for consistent validation
+            validation = self.llm.generate_json(
                 prompt,
-                generation_config={
-                    "response_mime_type": "application/json",
-                    "temperature": 0.3  # Lower temperature for consistent validation
-                }
+                temperature=0.3,
+                parse=lambda text: ValidationResult(**json.loads(text))
             )
             
-            data = json.loads(result.text)
-            validation = ValidationResult(**data)
-            
             # Additional post-validation checks
-            if validation.status == "PASS":
-                post_check = self._post_validation_checks(recipe)
-                if post_check:
-                    validation.status = "FLAG"
-                    validation.reason = post_check
-            
-            return validation
+            return self._apply_post_checks(recipe, validation)
             
         except Exception as e:
             return ValidationResult(
                 status="FLAG",
-                reason=f"Validation error: {str(e)}"
+                reason=f"{VALIDATION_ERROR} {str(e)}"
             )
     
+    def validate_recipes_batch(self, recipes: List[Dict]) -> List[ValidationResult]:
+        """Validate several recipes with one Gemini call
+        
+        The judge instructions are sent once for the whole batch. Recipes that
+        fail the quick checks are flagged without being sent, and any recipe
+        whose verdict is missing or malformed is re-judged alone with
+        validate_recipe. Results follow the input order.
+        """
+        results: List[Optional[ValidationResult]] = [None] * len(recipes)
+        for idx, recipe in enumerate(recipes):
+            quick_checks = self._quick_checks(recipe)
+            if quick_checks:
+                results[idx] = ValidationResult(status="FLAG", reason=quick_checks)
+        
+        pending = [idx for idx, result in enumerate(results) if result is None]
+        if len(pending) > 1:
+            recipe_blocks = "\n".join(
+                f"""
+        ### RECIPE {idx}
+        {self._describe_recipe(recipes[idx])}
+        """
+                for idx in pending
+            )
+            
+            prompt = f"""
+        You are a Food Safety & Quality Assurance Officer. Review each of the {len(pending)} recipes below for critical issues.
+        Judge every recipe on its own.
+        
+        RECIPES TO VALIDATE:
+        {recipe_blocks}
+        
+        {VALIDATION_CRITERIA}
+        
+        RESPOND WITH A JSON ARRAY ONLY, one object per recipe:
+        {{
+            "recipe_index": <RECIPE number>,
+            "status": "PASS" or "FLAG",
+            "reason": "Brief explanation. Use 'OK' if status is PASS"
+        }}
+        """
+            
+            try:
+                items = self.llm.generate_json(prompt, temperature=0.3, parse=self._parse_batch_items)
+                for item in items:
+                    idx = item.get("recipe_index")
+                    if isinstance(idx, int) and idx in pending and results[idx] is None:
+                        try:
+                            results[idx] = ValidationResult(status=item.get("status"), reason=item.get("reason"))
+                        except Exception as e:
+                            print(f"   ⚠️ Batch verdict for recipe {idx} invalid: {e}")
+            except Exception as e:
+                print(f"   ⚠️ Batch validation failed: {e}")
+            
+            for idx in pending:
+                if results[idx] is not None:
+                    results[idx] = self._apply_post_checks(recipes[idx], results[idx])
+        
+        # Judge whatever the batch didn't deliver, one recipe at a time
+        for idx, recipe in enumerate(recipes):
+            if results[idx] is None:
+                results[idx] = self.validate_recipe(recipe)
+        return results
+    
+    @staticmethod
+    def _parse_batch_items(text: str) -> List[Dict]:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            # Tolerate {"results": [...]} style wrappers
+            data = next((value for value in data.values() if isinstance(value, list)), None)
+        if not isinstance(data, list):
+            raise ValueError("Batch response is not a JSON array")
+        return [item for item in data if isinstance(item, dict)]
+    
     def _quick_checks(self, recipe: Dict) -> str:
         """Fast checks before AI validation"""
-        # Check required fields
-        required_fields = ['title', 'description', 'ingredients', 'steps']
-        for field in required_fields:
+        # Check required fields (limits are shared with the batch pre-screen)
+        for field in REQUIRED_FIELDS:
             if not recipe.get(field):
                 return f"Missing required field: {field}"
         
         # Check minimum requirements
-        if len(recipe.get('ingredients', [])) < 2:
-            return "Recipe has too few ingredients (minimum 2 required)"
+        if len(recipe.get('ingredients', [])) < MIN_INGREDIENTS:
+            return f"Recipe has too few ingredients (minimum {MIN_INGREDIENTS} required)"
         
-        if len(recipe.get('steps', [])) < 2:
-            return "Recipe has too few steps (minimum 2 required)"
+        if len(recipe.get('steps', [])) < MIN_STEPS:
+            return f"Recipe has too few steps (minimum {MIN_STEPS} required)"
         
         # Check for reasonable times
         prep_time = recipe.get('prep_time_minutes', 0)
@@ -125,13 +225,13 @@ class RecipeValidator:
         if prep_time < 0 or cook_time < 0:
             return "Negative time values are not allowed"
         
-        if prep_time + cook_time > 480:  # 8 hours max
-            return "Total cooking time exceeds 8 hours"
+        if prep_time + cook_time > MAX_TOTAL_MINUTES:
+            return f"Total cooking time exceeds {MAX_TOTAL_MINUTES / 60:g} hours"
         
         # Check servings
         servings = recipe.get('servings', 0)
-        if servings < 1 or servings > 50:
-            return "Number of servings must be between 1 and 50"
+        if servings < MIN_SERVINGS or servings > MAX_SERVINGS:
+            return f"Number of servings must be between {MIN_SERVINGS} and {MAX_SERVINGS}"
         
         return None  # All quick checks passed
     
@@ -139,11 +239,11 @@ class RecipeValidator:
         """Additional checks after AI validation"""
         # Check for duplicate ingredients
         ingredients = recipe.get('ingredients', [])
-        ingredient_names = [ing.get('item', '').lower() for ing in ingredients]
-        duplicates = [name for name in ingredient_names if ingredient_names.count(name) > 1]
+        name_counts = Counter(ing.get('item', '').lower() for ing in ingredients)
+        duplicates = [name for name, count in name_counts.items() if count > 1]
         
         if duplicates:
-            return f"Duplicate ingredients: {', '.join(set(duplicates))}"
+            return f"Duplicate ingredients: {', '.join(duplicates)}"
         
         # Check for step order consistency
         steps = recipe.get('steps', [])
@@ -153,55 +253,141 @@ class RecipeValidator:
         
         return None  # All post checks passed
     
+    def _cross_reference_note(self, recipe: Dict) -> Optional[str]:
+        """Soft note on foods the steps mention but the list leaves out
+        
+        A keyword match can't tell a forgotten ingredient from a serving
+        suggestion, so this is reported next to a PASS rather than flagging.
+        """
+        refs = cross_reference(
+            [ing.get('item', '') for ing in recipe.get('ingredients', [])],
+            [step.get('instruction', '') for step in recipe.get('steps', [])]
+        )
+        if refs.unknown:
+            return f"Note: steps mention unlisted {', '.join(refs.unknown)}"
+        return None
+    
+    def _apply_post_checks(self, recipe: Dict, validation: ValidationResult) -> ValidationResult:
+        """Flag a judge PASS that fails a post check; otherwise attach any cross-reference note"""
+        if validation.status != "PASS":
+            return validation
+        
+        post_check = self._post_validation_checks(recipe)
+        if post_check:
+            return ValidationResult(status="FLAG", reason=post_check)
+        
+        note = self._cross_reference_note(recipe)
+        if note:
+            validation.reason = f"{validation.reason} ({note})"
+        return validation
+    
+    def _validate_entries(self, recipes: List[Dict]) -> List[Tuple[Dict, str]]:
+        """Validate a chunk of recipes into output entries plus the stats bucket each counts towards"""
+        try:
+            if len(recipes) == 1:
+                results = [self.validate_recipe(recipes[0])]
+            else:
+                results = self.validate_recipes_batch(recipes)
+            verdicts = [(result.status, result.reason, result.status) for result in results]
+        except Exception as e:
+            verdicts = [("FLAG", f"Validation system error: {str(e)}", "ERROR")] * len(recipes)
+        
+        return [
+            (self._entry(recipe, status, reason), outcome)
+            for recipe, (status, reason, outcome) in zip(recipes, verdicts)
+        ]
+    
+    @staticmethod
+    def _entry(recipe: Dict, status: str, reason: str) -> Dict:
+        """Combine recipe with validation metadata"""
+        return {
+            "recipe": recipe,
+            "qa_meta": {
+                "status": status,
+                "reason": reason,
+                "validated_at": datetime.now().isoformat()
+            }
+        }
+    
     def validate_batch(self, input_file: str) -> str:
-        """Validate all recipes in a batch file"""
+        """Validate all recipes in a batch file
+        
+        Recipes are judged by a bounded worker pool and reported as they
+        finish; the output keeps the input order. With a batch size above 1,
+        each worker sends that many recipes to Gemini in one request.
+        
+        The whole batch is pre-screened first: recipes failing a hard rule are
+        flagged without a Gemini call, and batch outliers that the judge
+        passes are flagged for review. Recipes the ledger already has a
+        verdict for (same content, same validator version) reuse it.
+        """
         print(f"🕵️‍♂️ Validating batch: {os.path.basename(input_file)}")
         
         # Load recipes
         with open(input_file, 'r') as f:
             recipes = json.load(f)
         
-        validated_output = []
+        validated_output = [None] * len(recipes)
         stats = {"PASS": 0, "FLAG": 0, "ERROR": 0}
         
-        print(f"   📊 Found {len(recipes)} recipes to validate\n")
+        print(f"   📊 Found {len(recipes)} recipes to validate "
+              f"({self.concurrency} requests at a time, {self.batch_size} per request)\n")
+        
+        # Whole-batch pre-screen: clear failures never reach the judge
+        screenings = self.prescreen.screen(recipes)
+        to_judge = [idx for idx, screening in enumerate(screenings) if not screening.hard_failure]
+        outlier_count = sum(1 for idx in to_judge if screenings[idx].outliers)
+        print(f"   🧮 Pre-screen: {len(recipes) - len(to_judge)} flagged without the judge, "
+              f"{outlier_count} batch outlier(s)\n")
+        
+        # Unchanged recipes keep the verdict this validator version already gave them
+        hashes = [recipe_hash(recipe) for recipe in recipes]
+        prior = {} if self.revalidate else self.ledger.get_many([hashes[idx] for idx in to_judge])
+        reused = [idx for idx in to_judge if hashes[idx] in prior]
+        to_judge = [idx for idx in to_judge if hashes[idx] not in prior]
+        print(f"   📒 Ledger: {len(reused)} verdict(s) reused, {len(to_judge)} recipe(s) to judge\n")
+        
+        done = 0
         
-        for idx, recipe in enumerate(recipes, 1):
-            title = recipe.get('title', 'Unknown')
-            print(f"   [{idx}/{len(recipes)}] Validating: {title}")
+        def record(idx: int, entry: Dict, outcome: str):
+            nonlocal done
+            outliers = screenings[idx].outliers
+            if outcome == "PASS" and outliers:
+                # The judge saw nothing wrong, but the recipe stands out from its batch
+                entry["qa_meta"]["status"] = "FLAG"
+                entry["qa_meta"]["reason"] = f"Batch outlier: {'; '.join(outliers)}"
+                outcome = "FLAG"
             
-            try:
-                validation = self.validate_recipe(recipe)
-                stats[validation.status] += 1
-                
-                # Combine recipe with validation metadata
-                validated_output.append({
-                    "recipe": recipe,
-                    "qa_meta": {
-                        "status": validation.status,
-                        "reason": validation.reason,
-                        "validated_at": datetime.now().isoformat()
-                    }
-                })
-                
-                status_icon = "✅" if validation.status == "PASS" else "⚠️"
-                print(f"      {status_icon} {validation.status}: {validation.reason}")
-                
-            except Exception as e:
-                stats["ERROR"] += 1
-                print(f"      ❌ Error: {e}")
-                validated_output.append({
-                    "recipe": recipe,
-                    "qa_meta": {
-                        "status": "FLAG",
-                        "reason": f"Validation system error: {str(e)}",
-                        "validated_at": datetime.now().isoformat()
-                    }
-                })
+            validated_output[idx] = entry
+            stats[outcome] += 1
+            done += 1
             
-            # Rate limiting for API
-            if idx < len(recipes):
-                time.sleep(0.5)
+            title = entry["recipe"].get('title', 'Unknown')
+            qa_meta = entry["qa_meta"]
+            status_icon = {"PASS": "✅", "FLAG": "⚠️", "ERROR": "❌"}[outcome]
+            print(f"   [{done}/{len(recipes)}] {status_icon} {title} — {qa_meta['status']}: {qa_meta['reason']}")
+        
+        for idx, screening in enumerate(screenings):
+            if screening.hard_failure:
+                record(idx, self._entry(recipes[idx], "FLAG", screening.hard_failure), "FLAG")
+        for idx in reused:
+            qa_meta = dict(prior[hashes[idx]])
+            record(idx, {"recipe": recipes[idx], "qa_meta": qa_meta}, qa_meta["status"])
+        
+        batch_size = max(1, self.batch_size)
+        chunks = [to_judge[start:start + batch_size] for start in range(0, len(to_judge), batch_size)]
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as pool:
+            futures = {
+                pool.submit(self._validate_entries, [recipes[idx] for idx in chunk]): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                for idx, (entry, outcome) in zip(futures[future], future.result()):
+                    # Failed calls are retried next run rather than remembered
+                    if outcome != "ERROR" and not entry["qa_meta"]["reason"].startswith(VALIDATION_ERROR):
+                        self.ledger.put(hashes[idx], entry["qa_meta"])
+                    record(idx, entry, outcome)
+                print(f"      Running: ✅ {stats['PASS']}  ⚠️ {stats['FLAG']}  ❌ {stats['ERROR']}")
         
         # Save validated batch
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -235,7 +421,21 @@ class RecipeValidator:
 
 def main():
     """Main execution function"""
-    validator = RecipeValidator()
+    parser = argparse.ArgumentParser(description="Validate generated recipes with an LLM judge")
+    parser.add_argument("--concurrency", type=int, help="Recipes to validate at once (1 = sequential)")
+    parser.add_argument("--batch-size", type=int,
+                        help="Recipes to judge per Gemini call (missing verdicts are retried alone)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the local LLM cache")
+    parser.add_argument("--revalidate", action="store_true",
+                        help="Judge every recipe again instead of reusing verdicts from the ledger")
+    args = parser.parse_args()
+    
+    validator = RecipeValidator(
+        use_cache=not args.no_cache,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        revalidate=args.revalidate
+    )
     
     # Validate the latest batch
     output_file = validator.validate_latest()
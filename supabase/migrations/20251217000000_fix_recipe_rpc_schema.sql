@@ -0,0 +1,117 @@
+-- Make create_recipe_with_ingredients match the actual schema so the recipe
+-- miner can upload a whole recipe in one transactional call.
+-- The previous version wrote to a non-existent recipe_steps table, cast tags
+-- with an invalid JSONB -> TEXT[] cast, and stored batch_id as text.
+
+-- 1. Columns the uploader tracks batches and tags with
+ALTER TABLE public.recipes ADD COLUMN IF NOT EXISTS tags text[] DEFAULT ARRAY[]::text[];
+ALTER TABLE public.recipes ADD COLUMN IF NOT EXISTS batch_id uuid;
+
+CREATE INDEX IF NOT EXISTS idx_recipes_batch_id ON public.recipes(batch_id) WHERE batch_id IS NOT NULL;
+
+-- 2. Fixed function
+CREATE OR REPLACE FUNCTION create_recipe_with_ingredients(
+    recipe_data JSONB,
+    ingredients_data JSONB,
+    steps_data JSONB
+)
+RETURNS UUID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    recipe_id UUID;
+    ingredient JSONB;
+    step JSONB;
+BEGIN
+    -- Insert the recipe
+    INSERT INTO recipes (
+        title,
+        description,
+        prep_time_minutes,
+        cook_time_minutes,
+        servings,
+        difficulty,
+        user_id,
+        space_id,
+        is_public,
+        privacy_level,
+        tags,
+        batch_id,
+        qa_status,
+        created_at,
+        updated_at
+    ) VALUES (
+        recipe_data->>'title',
+        COALESCE(recipe_data->>'description', ''),
+        (recipe_data->>'prep_time_minutes')::INTEGER,
+        (recipe_data->>'cook_time_minutes')::INTEGER,
+        (recipe_data->>'servings')::INTEGER,
+        recipe_data->>'difficulty',
+        (recipe_data->>'user_id')::UUID,
+        (recipe_data->>'space_id')::UUID,
+        COALESCE((recipe_data->>'is_public')::BOOLEAN, false),
+        COALESCE(recipe_data->>'privacy_level', 'space'),
+        ARRAY(SELECT jsonb_array_elements_text(COALESCE(recipe_data->'tags', '[]'::JSONB))),
+        NULLIF(recipe_data->>'batch_id', '')::UUID,
+        COALESCE(recipe_data->>'qa_status', 'pending'),
+        NOW(),
+        NOW()
+    ) RETURNING id INTO recipe_id;
+
+    -- Insert ingredients (using text fields, not IDs)
+    IF ingredients_data IS NOT NULL THEN
+        FOR ingredient IN SELECT * FROM jsonb_array_elements(ingredients_data)
+        LOOP
+            INSERT INTO ingredients (
+                recipe_id,
+                food_id,
+                unit_id,
+                food_name,
+                unit_name,
+                amount,
+                order_index,
+                created_at
+            ) VALUES (
+                recipe_id,
+                NULLIF(ingredient->>'food_id', '')::UUID,
+                NULLIF(ingredient->>'unit_id', '')::UUID,
+                ingredient->>'food_name',
+                ingredient->>'unit_name',
+                (ingredient->>'amount')::NUMERIC,
+                COALESCE((ingredient->>'order_index')::INTEGER, 0),
+                NOW()
+            );
+        END LOOP;
+    END IF;
+
+    -- Insert steps into the steps table the app reads
+    IF steps_data IS NOT NULL THEN
+        FOR step IN SELECT * FROM jsonb_array_elements(steps_data)
+        LOOP
+            INSERT INTO steps (
+                recipe_id,
+                order_number,
+                instruction,
+                duration_minutes,
+                created_at
+            ) VALUES (
+                recipe_id,
+                (step->>'order_number')::INTEGER,
+                step->>'instruction',
+                (step->>'duration_minutes')::INTEGER,
+                NOW()
+            );
+        END LOOP;
+    END IF;
+
+    -- Any failure above aborts the whole call, so no partial recipe is left behind
+    RETURN recipe_id;
+END;
+$$;
+
+-- The function bypasses RLS and trusts user_id/space_id from its arguments,
+-- so only the service role (the miner's uploader) may call it
+REVOKE EXECUTE ON FUNCTION create_recipe_with_ingredients(JSONB, JSONB, JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION create_recipe_with_ingredients(JSONB, JSONB, JSONB) TO service_role;
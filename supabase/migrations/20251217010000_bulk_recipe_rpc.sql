@@ -0,0 +1,156 @@
+-- Set-based bulk recipe upload for the recipe miner.
+-- create_recipes_bulk takes an array of {recipe, ingredients, steps} objects
+-- and inserts every recipe, ingredient and step with one INSERT ... SELECT per
+-- table, all in one transaction. It returns the new recipe IDs in input order.
+
+CREATE OR REPLACE FUNCTION create_recipes_bulk(recipes_data JSONB)
+RETURNS UUID[]
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    new_ids UUID[];
+BEGIN
+    IF recipes_data IS NULL OR jsonb_array_length(recipes_data) = 0 THEN
+        RETURN ARRAY[]::UUID[];
+    END IF;
+
+    -- Assign IDs up front so child rows can reference their recipe by position
+    SELECT array_agg(gen_random_uuid() ORDER BY t.ord)
+    INTO new_ids
+    FROM jsonb_array_elements(recipes_data) WITH ORDINALITY AS t(item, ord);
+
+    INSERT INTO recipes (
+        id,
+        title,
+        description,
+        prep_time_minutes,
+        cook_time_minutes,
+        servings,
+        difficulty,
+        user_id,
+        space_id,
+        is_public,
+        privacy_level,
+        tags,
+        batch_id,
+        qa_status,
+        created_at,
+        updated_at
+    )
+    SELECT
+        new_ids[t.ord::INTEGER],
+        r.title,
+        COALESCE(r.description, ''),
+        r.prep_time_minutes,
+        r.cook_time_minutes,
+        r.servings,
+        r.difficulty,
+        r.user_id,
+        r.space_id,
+        COALESCE(r.is_public, false),
+        COALESCE(r.privacy_level, 'space'),
+        ARRAY(SELECT jsonb_array_elements_text(COALESCE(r.tags, '[]'::JSONB))),
+        NULLIF(r.batch_id, '')::UUID,
+        COALESCE(r.qa_status, 'pending'),
+        NOW(),
+        NOW()
+    FROM jsonb_array_elements(recipes_data) WITH ORDINALITY AS t(item, ord)
+    CROSS JOIN LATERAL jsonb_to_record(t.item->'recipe') AS r(
+        title TEXT,
+        description TEXT,
+        prep_time_minutes INTEGER,
+        cook_time_minutes INTEGER,
+        servings INTEGER,
+        difficulty TEXT,
+        user_id UUID,
+        space_id UUID,
+        is_public BOOLEAN,
+        privacy_level TEXT,
+        tags JSONB,
+        batch_id TEXT,
+        qa_status TEXT
+    );
+
+    INSERT INTO ingredients (
+        recipe_id,
+        food_id,
+        unit_id,
+        food_name,
+        unit_name,
+        amount,
+        order_index,
+        created_at
+    )
+    SELECT
+        new_ids[t.ord::INTEGER],
+        i.food_id,
+        i.unit_id,
+        i.food_name,
+        i.unit_name,
+        i.amount,
+        COALESCE(i.order_index, 0),
+        NOW()
+    FROM jsonb_array_elements(recipes_data) WITH ORDINALITY AS t(item, ord)
+    CROSS JOIN LATERAL jsonb_to_recordset(COALESCE(t.item->'ingredients', '[]'::JSONB)) AS i(
+        food_id UUID,
+        unit_id UUID,
+        food_name TEXT,
+        unit_name TEXT,
+        amount NUMERIC,
+        order_index INTEGER
+    );
+
+    INSERT INTO steps (
+        recipe_id,
+        order_number,
+        instruction,
+        duration_minutes,
+        created_at
+    )
+    SELECT
+        new_ids[t.ord::INTEGER],
+        s.order_number,
+        s.instruction,
+        s.duration_minutes,
+        NOW()
+    FROM jsonb_array_elements(recipes_data) WITH ORDINALITY AS t(item, ord)
+    CROSS JOIN LATERAL jsonb_to_recordset(COALESCE(t.item->'steps', '[]'::JSONB)) AS s(
+        order_number INTEGER,
+        instruction TEXT,
+        duration_minutes INTEGER
+    );
+
+    RETURN new_ids;
+END;
+$$;
+
+-- The function bypasses RLS and trusts user_id/space_id from the payload,
+-- so only the service role (the miner's uploader) may call it
+REVOKE EXECUTE ON FUNCTION create_recipes_bulk(JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION create_recipes_bulk(JSONB) TO service_role;
+
+-- The single-recipe RPC becomes a one-element bulk call, so both share the
+-- set-based inserts instead of looping row by row
+CREATE OR REPLACE FUNCTION create_recipe_with_ingredients(
+    recipe_data JSONB,
+    ingredients_data JSONB,
+    steps_data JSONB
+)
+RETURNS UUID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    RETURN (create_recipes_bulk(jsonb_build_array(jsonb_build_object(
+        'recipe', recipe_data,
+        'ingredients', COALESCE(ingredients_data, '[]'::JSONB),
+        'steps', COALESCE(steps_data, '[]'::JSONB)
+    ))))[1];
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION create_recipe_with_ingredients(JSONB, JSONB, JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION create_recipe_with_ingredients(JSONB, JSONB, JSONB) TO service_role;
@@ -0,0 +1,198 @@
+-- Idempotent recipe uploads for the recipe miner.
+-- Each mined recipe carries a content hash; a unique index keeps a recipe
+-- from being stored twice in the same space, and create_recipes_bulk skips
+-- recipes the target space already has instead of duplicating them, so a
+-- failed load can simply be run again. It reports which recipes it inserted,
+-- so the uploader can tell new recipes from ones an earlier run stored.
+
+-- 1. Content hash column (NULL for recipes created in the app, which never conflict)
+ALTER TABLE public.recipes ADD COLUMN IF NOT EXISTS content_hash text;
+
+-- Scoped by space: the same recipe may be uploaded to several spaces
+CREATE UNIQUE INDEX IF NOT EXISTS idx_recipes_space_content_hash ON public.recipes(space_id, content_hash);
+
+-- 2. Bulk upload that inserts only new recipes. Returns one row per input
+--    recipe, in input order: its position, the ID of the new or already
+--    stored copy, and whether this call inserted it. The return type differs
+--    from the 20251217010000 version, so the old function is dropped first.
+DROP FUNCTION IF EXISTS create_recipes_bulk(JSONB);
+
+CREATE FUNCTION create_recipes_bulk(recipes_data JSONB)
+RETURNS TABLE(ord INTEGER, recipe_id UUID, inserted BOOLEAN)
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+#variable_conflict use_column
+DECLARE
+    new_ids UUID[];
+    inserted_ids UUID[];
+BEGIN
+    IF recipes_data IS NULL OR jsonb_array_length(recipes_data) = 0 THEN
+        RETURN;
+    END IF;
+
+    -- Assign IDs up front so child rows can reference their recipe by position
+    SELECT array_agg(gen_random_uuid() ORDER BY t.ord)
+    INTO new_ids
+    FROM jsonb_array_elements(recipes_data) WITH ORDINALITY AS t(item, ord);
+
+    -- Recipes whose hash the space already has (or repeated earlier in this call) are skipped
+    WITH created AS (
+        INSERT INTO recipes (
+            id,
+            title,
+            description,
+            prep_time_minutes,
+            cook_time_minutes,
+            servings,
+            difficulty,
+            user_id,
+            space_id,
+            is_public,
+            privacy_level,
+            tags,
+            batch_id,
+            qa_status,
+            content_hash,
+            created_at,
+            updated_at
+        )
+        SELECT
+            new_ids[t.ord::INTEGER],
+            r.title,
+            COALESCE(r.description, ''),
+            r.prep_time_minutes,
+            r.cook_time_minutes,
+            r.servings,
+            r.difficulty,
+            r.user_id,
+            r.space_id,
+            COALESCE(r.is_public, false),
+            COALESCE(r.privacy_level, 'space'),
+            ARRAY(SELECT jsonb_array_elements_text(COALESCE(r.tags, '[]'::JSONB))),
+            NULLIF(r.batch_id, '')::UUID,
+            COALESCE(r.qa_status, 'pending'),
+            NULLIF(r.content_hash, ''),
+            NOW(),
+            NOW()
+        FROM jsonb_array_elements(recipes_data) WITH ORDINALITY AS t(item, ord)
+        CROSS JOIN LATERAL jsonb_to_record(t.item->'recipe') AS r(
+            title TEXT,
+            description TEXT,
+            prep_time_minutes INTEGER,
+            cook_time_minutes INTEGER,
+            servings INTEGER,
+            difficulty TEXT,
+            user_id UUID,
+            space_id UUID,
+            is_public BOOLEAN,
+            privacy_level TEXT,
+            tags JSONB,
+            batch_id TEXT,
+            qa_status TEXT,
+            content_hash TEXT
+        )
+        ORDER BY t.ord
+        ON CONFLICT (space_id, content_hash) DO NOTHING
+        RETURNING id
+    )
+    SELECT COALESCE(array_agg(id), ARRAY[]::UUID[])
+    INTO inserted_ids
+    FROM created;
+
+    -- Child rows only for recipes this call created
+    INSERT INTO ingredients (
+        recipe_id,
+        food_id,
+        unit_id,
+        food_name,
+        unit_name,
+        amount,
+        order_index,
+        created_at
+    )
+    SELECT
+        new_ids[t.ord::INTEGER],
+        i.food_id,
+        i.unit_id,
+        i.food_name,
+        i.unit_name,
+        i.amount,
+        COALESCE(i.order_index, 0),
+        NOW()
+    FROM jsonb_array_elements(recipes_data) WITH ORDINALITY AS t(item, ord)
+    CROSS JOIN LATERAL jsonb_to_recordset(COALESCE(t.item->'ingredients', '[]'::JSONB)) AS i(
+        food_id UUID,
+        unit_id UUID,
+        food_name TEXT,
+        unit_name TEXT,
+        amount NUMERIC,
+        order_index INTEGER
+    )
+    WHERE new_ids[t.ord::INTEGER] = ANY(inserted_ids);
+
+    INSERT INTO steps (
+        recipe_id,
+        order_number,
+        instruction,
+        duration_minutes,
+        created_at
+    )
+    SELECT
+        new_ids[t.ord::INTEGER],
+        s.order_number,
+        s.instruction,
+        s.duration_minutes,
+        NOW()
+    FROM jsonb_array_elements(recipes_data) WITH ORDINALITY AS t(item, ord)
+    CROSS JOIN LATERAL jsonb_to_recordset(COALESCE(t.item->'steps', '[]'::JSONB)) AS s(
+        order_number INTEGER,
+        instruction TEXT,
+        duration_minutes INTEGER
+    )
+    WHERE new_ids[t.ord::INTEGER] = ANY(inserted_ids);
+
+    -- Skipped recipes report the ID of the copy already stored in their space
+    RETURN QUERY
+    SELECT
+        t.ord::INTEGER,
+        COALESCE(existing.id, new_ids[t.ord::INTEGER]),
+        new_ids[t.ord::INTEGER] = ANY(inserted_ids)
+    FROM jsonb_array_elements(recipes_data) WITH ORDINALITY AS t(item, ord)
+    LEFT JOIN recipes existing
+        ON existing.space_id = (t.item->'recipe'->>'space_id')::UUID
+        AND existing.content_hash = NULLIF(t.item->'recipe'->>'content_hash', '')
+    ORDER BY t.ord;
+END;
+$$;
+
+-- Bypasses RLS and trusts user_id/space_id from the payload: service role only
+REVOKE EXECUTE ON FUNCTION create_recipes_bulk(JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION create_recipes_bulk(JSONB) TO service_role;
+
+-- 3. The single-recipe RPC reads the ID from the new result shape
+CREATE OR REPLACE FUNCTION create_recipe_with_ingredients(
+    recipe_data JSONB,
+    ingredients_data JSONB,
+    steps_data JSONB
+)
+RETURNS UUID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    RETURN (
+        SELECT bulk.recipe_id
+        FROM create_recipes_bulk(jsonb_build_array(jsonb_build_object(
+            'recipe', recipe_data,
+            'ingredients', COALESCE(ingredients_data, '[]'::JSONB),
+            'steps', COALESCE(steps_data, '[]'::JSONB)
+        ))) AS bulk
+    );
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION create_recipe_with_ingredients(JSONB, JSONB, JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION create_recipe_with_ingredients(JSONB, JSONB, JSONB) TO service_role;